@@ -0,0 +1,92 @@
+import argparse
+import json
+import random
+import time
+
+from core.models.geometry.direction import Direction
+from core.models.geometry.node import Node
+from core.models.geometry.pose import Pose
+from core.models.railway.railway_system import RailwaySystem
+
+_DRAG_FRAMES = 10  # cursor positions per drag, each a cell or so from the last
+
+
+def load_railway(filepath: str) -> RailwaySystem:
+    railway = RailwaySystem()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        railway.replace_from_dict(json.load(f))
+    return railway
+
+
+def best_of(repeat: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_find_grid_path(railway: RailwaySystem, queries: int, repeat: int, seed: int) -> float:
+    """Time one-off track searches between random free cells around the network, returns ms per search."""
+    rng = random.Random(seed)
+    nodes = sorted(railway.graph.nodes)
+    cases: list[tuple[Pose, Node]] = []
+    while len(cases) < queries:
+        anchor = rng.choice(nodes)
+        start = Node(anchor.x + rng.randint(-30, 30), anchor.y + rng.randint(-30, 30))
+        end = Node(start.x + rng.randint(-12, 12), start.y + rng.randint(-12, 12))
+        if start == end or railway.pathfinder.is_node_blocked(start) or railway.pathfinder.is_node_blocked(end):
+            continue
+        cases.append((Pose(start, Direction(0, 0)), end))
+
+    def run():
+        for start, end in cases:
+            railway.pathfinder.find_grid_path(start, end)
+
+    return best_of(repeat, run) * 1000 / queries
+
+
+def bench_preview_grid_path(railway: RailwaySystem, drags: int, repeat: int, seed: int) -> float:
+    """Time track previews following a cursor dragged from random free cells around the network, returns ms per frame."""
+    rng = random.Random(seed)
+    nodes = sorted(railway.graph.nodes)
+    is_node_blocked = railway.pathfinder.is_node_blocked
+    cases: list[tuple[Pose, list[Node]]] = []
+    while len(cases) < drags:
+        anchor = rng.choice(nodes)
+        start = Node(anchor.x + rng.randint(-30, 30), anchor.y + rng.randint(-30, 30))
+        end = Node(start.x + rng.randint(-12, 12), start.y + rng.randint(-12, 12))
+        if start == end or is_node_blocked(start) or is_node_blocked(end):
+            continue
+        ends = [end]
+        for _ in range(_DRAG_FRAMES - 1):
+            end = Node(end.x + rng.randint(-1, 1), end.y + rng.randint(-1, 1))
+            if end != start and not is_node_blocked(end):
+                ends.append(end)
+        cases.append((Pose(start, Direction(0, 0)), ends))
+
+    def run():
+        for start, ends in cases:
+            for end in ends:
+                railway.pathfinder.preview_grid_path(start, end)
+
+    return best_of(repeat, run) * 1000 / sum(len(ends) for _, ends in cases)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the railway model.")
+    parser.add_argument("map", help="map JSON file, e.g. maps/142.json")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--drags", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    railway = load_railway(args.map)
+    print(f"find_grid_path: {bench_find_grid_path(railway, args.queries, args.repeat, args.seed):.3f} ms/search")
+    print(f"preview_grid_path: {bench_preview_grid_path(railway, args.drags, args.repeat, args.seed):.3f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
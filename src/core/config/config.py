@@ -1,10 +1,17 @@
 class Config:
     MAPS_FOLDER = "maps"
+    COMMAND_LOGS_FOLDER = "logs"  #recorded simulation sessions, see headless.py --replay
     GRID_SIZE = 40
     BUTTON_SIZE = 50
     STATION_RECT_WIDTH = 6
     STATION_RECT_HEIGHT = 1
-    FPS = 20
+    FPS = 20  #rendered frames per second
+    SIMULATION_TICK_RATE = 20  #fixed simulation steps per simulated second
+    MAX_SIMULATION_CATCH_UP = 0.25  #seconds of wall time a slow frame may catch up on
+    MAX_SPEED_FRAME_SHARE = 0.8  #share of each frame spent ticking in max speed mode
+    SIMULATION_TICK_BATCH = 10  #initial ticks per deadline check in max speed mode, adapts to the frame budget
+    AUTO_DISPATCH_INTERVAL = 20  #ticks between passes of the automatic dispatcher
+    ARRAY_GRAPH_MIN_EDGES = 5000  #maps with at least this many edges load into the array backed graph
     
     
     MIN_TRACK_SPEED = 10
@@ -23,7 +23,9 @@ TIME_CONTROL_KEYS = {
     pygame.K_2: TimeControlMode.PLAY,
     pygame.K_3: TimeControlMode.FAST_FORWARD,
     pygame.K_4: TimeControlMode.SUPER_FAST_FORWARD,
+    pygame.K_5: TimeControlMode.MAX_SPEED,
     pygame.K_SPACE: "toggle_pause",
+    pygame.K_a: "toggle_auto_dispatch",
 }
 
 from modules.setup.train_placement.models.train_placement_state import TrainPlacementTool
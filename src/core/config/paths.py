@@ -23,6 +23,7 @@ ICON_CATEGORIES = {
         "PAUSE": "pause.png",
         "FAST_FORWARD": "fast.png",
         "SUPER_FAST_FORWARD": "super_fast.png",
+        "MAX_SPEED": "max_speed.png",
     },
     "train_placement/": {
         "PLACE_TRAIN": "place_train.png",
@@ -1,39 +1,49 @@
-from dataclasses import dataclass
+from typing import NamedTuple
 
-@dataclass(frozen=True, order=True)
-class Direction:
+class Direction(NamedTuple):
     x : int
     y : int
-    
+
     def opposite(self):
-        return Direction(-self.x, -self.y)
-    
-    def __iter__(self):
-        return iter((self.x, self.y))
-    
+        return _OPPOSITES[self]
+
     def is_zero(self) -> bool:
         return self.x == 0 and self.y == 0
-    
-    def get_valid_turns(self) -> list['Direction']:
-        VALID_TURNS = {
-            Direction(-1, -1): [Direction(-1, -1), Direction(-1, 0), Direction(0, -1)],
-            Direction(-1, 1): [Direction(-1, 1), Direction(-1, 0), Direction(0, 1)],
-            Direction(1, -1): [Direction(1, -1), Direction(1, 0), Direction(0, -1)],
-            Direction(1, 1): [Direction(1, 1), Direction(1, 0), Direction(0, 1)],
-            Direction(-1, 0): [Direction(-1, 0), Direction(-1, -1), Direction(-1, 1)],
-            Direction(1, 0): [Direction(1, 0), Direction(1, -1), Direction(1, 1)],
-            Direction(0, -1): [Direction(0, -1), Direction(-1, -1), Direction(1, -1)],
-            Direction(0, 1): [Direction(0, 1), Direction(-1, 1), Direction(1, 1)],
-            Direction(0, 0): [
-                Direction(-1, -1), Direction(-1, 0), Direction(-1, 1),
-                Direction(1, -1), Direction(1, 0), Direction(1, 1),
-                Direction(0, -1), Direction(0, 1)
-                ]
-        }
-        return VALID_TURNS[self]
-    
+
+    def get_valid_turns(self) -> tuple['Direction', ...]:
+        return _VALID_TURNS[self]
+
     def to_dict(self) -> dict:
         return {
             "x": self.x,
             "y": self.y
-        }
\ No newline at end of file
+        }
+
+
+# Canonical instances and turn tables are built once, every lookup returns the same objects.
+_DIRECTIONS: dict[tuple[int, int], Direction] = {
+    (x, y): Direction(x, y) for x in (-1, 0, 1) for y in (-1, 0, 1)
+}
+
+_OPPOSITES: dict[Direction, Direction] = {
+    direction: _DIRECTIONS[-direction.x, -direction.y] for direction in _DIRECTIONS.values()
+}
+
+def _turns(*components: tuple[int, int]) -> tuple[Direction, ...]:
+    return tuple(_DIRECTIONS[c] for c in components)
+
+_VALID_TURNS: dict[Direction, tuple[Direction, ...]] = {
+    _DIRECTIONS[-1, -1]: _turns((-1, -1), (-1, 0), (0, -1)),
+    _DIRECTIONS[-1, 1]: _turns((-1, 1), (-1, 0), (0, 1)),
+    _DIRECTIONS[1, -1]: _turns((1, -1), (1, 0), (0, -1)),
+    _DIRECTIONS[1, 1]: _turns((1, 1), (1, 0), (0, 1)),
+    _DIRECTIONS[-1, 0]: _turns((-1, 0), (-1, -1), (-1, 1)),
+    _DIRECTIONS[1, 0]: _turns((1, 0), (1, -1), (1, 1)),
+    _DIRECTIONS[0, -1]: _turns((0, -1), (-1, -1), (1, -1)),
+    _DIRECTIONS[0, 1]: _turns((0, 1), (-1, 1), (1, 1)),
+    _DIRECTIONS[0, 0]: _turns(
+        (-1, -1), (-1, 0), (-1, 1),
+        (1, -1), (1, 0), (1, 1),
+        (0, -1), (0, 1)
+    ),
+}
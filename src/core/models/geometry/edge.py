@@ -1,10 +1,10 @@
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
 from core.models.geometry.direction import Direction
 from core.models.geometry.node import Node
 from core.models.geometry.position import Position
 
 
-@dataclass(frozen=True, order=True)
+@dataclass(frozen=True, order=True, slots=True)
 class Edge:
     a: Node
     b: Node
@@ -18,12 +18,12 @@ class Edge:
 
     def __hash__(self):
         # Make it hashable independent of endpoint order
-        return hash(frozenset((self.a, self.b)))
+        return hash(self.a) ^ hash(self.b)
 
     def __eq__(self, other):
         if not isinstance(other, Edge):
             return NotImplemented
-        return {self.a, self.b} == {other.a, other.b}
+        return (self.a == other.a and self.b == other.b) or (self.a == other.b and self.b == other.a)
     
     def tunnel_level(self) -> 'Edge':
         return Edge(self.a.tunnel_level(), self.b.tunnel_level())
@@ -56,7 +56,7 @@ class Edge:
         return Edge(self.b, self.a)
         
     def to_dict(self) -> dict:
-        return asdict(self)
+        return {"a": self.a.to_dict(), "b": self.b.to_dict()}
     
     @classmethod
     def from_dict(cls, data: dict) -> 'Edge':
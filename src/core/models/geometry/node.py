@@ -1,67 +1,73 @@
-from dataclasses import dataclass, asdict
+from typing import NamedTuple
 from math import hypot
 from core.config.config import Config
-from core.models.geometry.direction import Direction
+from core.models.geometry.direction import Direction, _DIRECTIONS
 
-@dataclass(frozen=True, order=True)
-class Node:
+class Node(NamedTuple):
     x: int
     y: int
     level: int = 0
-    
-    def __post_init__(self):
-        if not isinstance(self.x, int):
-            raise TypeError("x must be int")
-        if not isinstance(self.y, int):
-            raise TypeError("y must be int")
-    
+
     def distance_to(self, other: 'Node') -> float:
         """Calculate the Euclidean distance to another node."""
         return hypot(self.x - other.x, self.y - other.y)
-    
+
     def heuristic_to(self, other: 'Node') -> float:
         """Use chebysev distance as heuristic for A* pathfinding."""
         return max(abs(self.x - other.x), abs(self.y - other.y))
 
-    
+
     def station_rects_overlap(self, other: 'Node') -> bool:
         """Check if station rectangles at this point and another point overlap."""
         return (
             abs(self.x - other.x) < Config.STATION_RECT_WIDTH + 1 and
             abs(self.y - other.y) < Config.STATION_RECT_HEIGHT + 1
         )
-        
+
     def tunnel_level(self) -> 'Node':
-        return Node(self.x, self.y, level=1)
-    
+        return _new_node(Node, (self.x, self.y, 1))
+
     def surface_level(self) -> 'Node':
-        return Node(self.x, self.y, level=0)
+        return _new_node(Node, (self.x, self.y, 0))
 
     def toggle_level(self) -> 'Node':
-        return Node(self.x, self.y, level=0 if self.level != 0 else 1)
-    
+        return _new_node(Node, (self.x, self.y, 0 if self.level != 0 else 1))
+
+    def offset(self, direction: Direction) -> 'Node':
+        """Get the adjacent node in the given direction on the same level."""
+        return _new_node(Node, (self.x + direction.x, self.y + direction.y, self.level))
+
     def direction_to(self, other: 'Node') -> Direction:
         """Get direction from this point to another point."""
-        def signum(x: int) -> int:
-            return (x > 0) - (x < 0)
-        
-        if self == other:
+        dx = other.x - self.x
+        dy = other.y - self.y
+
+        if dx == 0 and dy == 0 and self.level == other.level:
             return ValueError("Same Point")
-        if abs(self.x - other.x) > 1 or abs(self.y - other.y) > 1:
+        if dx > 1 or dx < -1 or dy > 1 or dy < -1:
             raise ValueError("Points are not adjacent")
 
-        return Direction(signum(other.x - self.x), signum(other.y - self.y))
-    
+        return _DIRECTIONS[dx, dy]
+
     def is_within_station_rect(self, center: 'Node') -> bool:
         return (
             abs(center.x - self.x) * 2 < Config.STATION_RECT_WIDTH + 1 and
             abs(center.y - self.y) * 2 < Config.STATION_RECT_HEIGHT + 1
         )
-    
-    
+
+
     def to_dict(self) -> dict:
-        return asdict(self)
-    
+        return self._asdict()
+
     @classmethod
     def from_dict(cls, data: dict) -> 'Node':
-        return cls(**data)
\ No newline at end of file
+        # coordinates are only validated at the serialization boundary, construction stays cheap
+        if not isinstance(data["x"], int):
+            raise TypeError("x must be int")
+        if not isinstance(data["y"], int):
+            raise TypeError("y must be int")
+        return cls(**data)
+
+
+# tuple.__new__ skips the generated Python-level constructor on hot paths
+_new_node = tuple.__new__
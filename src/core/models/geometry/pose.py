@@ -1,8 +1,8 @@
 from typing import NamedTuple
 
 from core.models.geometry.edge import Edge
-from core.models.geometry.node import Node
-from core.models.geometry.direction import Direction
+from core.models.geometry.node import Node, _new_node
+from core.models.geometry.direction import Direction, _DIRECTIONS, _VALID_TURNS
 
 class Pose(NamedTuple):
     node: Node
@@ -18,15 +18,15 @@ class Pose(NamedTuple):
         return cls.from_nodes(edge.a, edge.b)
     
     def get_connecting_poses(self, other_level: bool = False) -> list['Pose']:
+        x, y, level = self.node
+        other = 0 if level != 0 else 1
         neighbors = []
-        for dir in self.direction.get_valid_turns():
-            nx = self.node.x + dir.x
-            ny = self.node.y + dir.y
-            new_state = Pose(Node(nx, ny, self.node.level), dir)
-
-            neighbors.append(new_state)
+        for dir in _VALID_TURNS[self.direction]:
+            nx = x + dir.x
+            ny = y + dir.y
+            neighbors.append(_new_pose(Pose, (_new_node(Node, (nx, ny, level)), dir)))
             if other_level:
-                neighbors.append(new_state.toggle_level())
+                neighbors.append(_new_pose(Pose, (_new_node(Node, (nx, ny, other)), dir)))
         return neighbors
     
     def tunnel_level(self) -> 'Pose':
@@ -39,24 +39,10 @@ class Pose(NamedTuple):
         return Pose(self.node, self.direction.opposite())
     
     def get_next_in_direction(self) -> 'Pose':
-        return Pose(
-            Node(
-                self.node.x + self.direction.x,
-                self.node.y + self.direction.y,
-                self.node.level
-            ),
-            self.direction
-        )
+        return _new_pose(Pose, (self.node.offset(self.direction), self.direction))
         
     def get_previous_in_direction(self) -> 'Pose':
-        return Pose(
-            Node(
-                self.node.x - self.direction.x,
-                self.node.y - self.direction.y,
-                self.node.level
-                ),
-            self.direction
-        )
+        return _new_pose(Pose, (self.node.offset(self.direction.opposite()), self.direction))
     
     
     def to_dict(self) -> dict:
@@ -70,5 +56,8 @@ class Pose(NamedTuple):
     def from_dict(cls, data: dict) -> 'Pose':
         return cls(
             node=Node.from_dict(data["node"]),
-            direction=Direction(**data["direction"])
-        )
\ No newline at end of file
+            direction=_DIRECTIONS[data["direction"]["x"], data["direction"]["y"]]
+        )
+
+
+_new_pose = tuple.__new__
\ No newline at end of file
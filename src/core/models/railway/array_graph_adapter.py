@@ -0,0 +1,367 @@
+from array import array
+from typing import Callable, Iterable
+
+from core.config.config import Config
+from core.models.geometry.edge import Edge
+from core.models.geometry.node import Node
+from core.models.railway.graph_adapter import GraphAdapter
+from core.models.railway.railway_change import ChangeKind, RailwayChange
+from core.models.rail import Rail
+
+NO_STATION = -1
+_COLUMN_KEYS = ('speed', 'length', 'level')
+
+class ArrayGraphAdapter(GraphAdapter):
+    """GraphAdapter backed by integer ids and typed arrays instead of networkx dicts.
+
+    Nodes are mapped to integer ids, every node keeps the ids of its edges in a small
+    array, and the common edge attributes live in one typed column each. Removed ids
+    are recycled so the columns stay dense on maps that are edited a lot.
+    """
+    def _init_storage(self) -> None:
+        self._node_ids: dict[Node, int] = {}
+        self._id_to_node: list[Node | None] = []
+        self._adjacency: list[array | None] = []
+        self._node_data: dict[int, dict] = {}
+        self._free_nodes: list[int] = []
+        self._x = array('i')
+        self._y = array('i')
+        self._node_level = array('b')
+
+        self._edge_ids: dict[tuple[int, int], int] = {}
+        self._source = array('i')
+        self._target = array('i')
+        self._speed = array('i')
+        self._length = array('i')
+        self._level = array('b')
+        self._station = array('i')
+        self._live = array('b')  # 0 for ids of removed edges waiting to be reused
+        self._edge_extra: dict[int, dict] = {}
+        self._free_edges: list[int] = []
+
+    @staticmethod
+    def _key(a: int, b: int) -> tuple[int, int]:
+        return (a, b) if a < b else (b, a)
+
+    def _edge_id(self, edge: Edge) -> int:
+        return self._edge_ids[self._key(self._node_ids[edge.a], self._node_ids[edge.b])]
+
+    def _find_edge_id(self, edge: Edge) -> int | None:
+        a = self._node_ids.get(edge.a)
+        b = self._node_ids.get(edge.b)
+        if a is None or b is None:
+            return None
+        return self._edge_ids.get(self._key(a, b))
+
+    def _other(self, edge_id: int, node_id: int) -> int:
+        source = self._source[edge_id]
+        return self._target[edge_id] if source == node_id else source
+
+    def _ensure_node(self, node: Node) -> int:
+        node_id = self._node_ids.get(node)
+        if node_id is not None:
+            return node_id
+        if self._free_nodes:
+            node_id = self._free_nodes.pop()
+            self._id_to_node[node_id] = node
+            self._adjacency[node_id] = array('i')
+            self._x[node_id] = node.x
+            self._y[node_id] = node.y
+            self._node_level[node_id] = node.level
+        else:
+            node_id = len(self._id_to_node)
+            self._id_to_node.append(node)
+            self._adjacency.append(array('i'))
+            self._x.append(node.x)
+            self._y.append(node.y)
+            self._node_level.append(node.level)
+        self._node_ids[node] = node_id
+        return node_id
+
+    @property
+    def nodes(self) -> Iterable[Node]:
+        return self._node_ids.keys()
+
+    def _build_edges(self) -> frozenset[Edge]:
+        return frozenset(self._edge_from_id(edge_id) for edge_id in self._edge_ids.values())
+
+    def _edge_from_id(self, edge_id: int) -> Edge:
+        return Edge(self._id_to_node[self._source[edge_id]], self._id_to_node[self._target[edge_id]])
+
+    def add_node(self, node: Node) -> None:
+        self._ensure_node(node)
+        self._modified(ChangeKind.NODE_ADDED, (node,))
+
+    def has_node(self, node: Node) -> bool:
+        return node in self._node_ids
+
+    def remove_node(self, node: Node) -> None:
+        node_id = self._node_ids[node]
+        neighbors = self.neighbors(node)
+        for edge_id in tuple(self._adjacency[node_id]):
+            self._drop_edge(edge_id)
+        self._drop_node(node_id)
+        self._modified(ChangeKind.NODE_REMOVED, (node, *neighbors))
+
+    def _drop_node(self, node_id: int) -> None:
+        del self._node_ids[self._id_to_node[node_id]]
+        self._id_to_node[node_id] = None
+        self._adjacency[node_id] = None
+        self._node_data.pop(node_id, None)
+        self._free_nodes.append(node_id)
+
+    def has_node_attr(self, node: Node, key: str) -> bool:
+        return key in self._node_data.get(self._node_ids[node], ())
+
+    def get_node_attr(self, node: Node, key: str) -> dict:
+        data = self._node_data.get(self._node_ids[node])
+        return None if data is None else data.get(key, None)
+
+    def _set_node_data(self, node: Node, key: str, value) -> None:
+        self._node_data.setdefault(self._node_ids[node], {})[key] = value
+
+    def _del_node_data(self, node_id: int, key: str) -> None:
+        data = self._node_data[node_id]
+        del data[key]
+        if not data:
+            del self._node_data[node_id]
+
+    def set_node_attr(self, node: Node, key: str, value) -> None:
+        self._set_node_data(node, key, value)
+        self._modified(ChangeKind.NODE_ATTR_CHANGED, (node,), key)
+
+    def block_node(self, node: Node) -> None:
+        self._set_node_data(node, 'blocked', True)
+        self._blocks_version += 1
+        # do not modify saved state
+
+    def unblock_node(self, node: Node) -> None:
+        self._del_node_data(self._node_ids[node], 'blocked')
+        self._blocks_version += 1
+
+    def remove_blocked_nodes(self) -> None:
+        blocked_ids = [node_id for node_id, data in self._node_data.items() if 'blocked' in data]
+        for node_id in blocked_ids:
+            self._del_node_data(node_id, 'blocked')
+        self._blocks_version += 1
+
+    def remove_node_attr(self, node: Node, key: str) -> None:
+        node_id = self._node_ids.get(node)
+        if node_id is not None and key in self._node_data.get(node_id, ()):
+            self._del_node_data(node_id, key)
+            self._modified(ChangeKind.NODE_ATTR_CHANGED, (node,), key)
+
+    def all_nodes_with_attr(self, key: str) -> dict[Node, dict]:
+        return {self._id_to_node[node_id]: data[key] for node_id, data in self._node_data.items() if key in data}
+
+    def degree_at(self, node: Node) -> int:
+        return len(self._adjacency[self._node_ids[node]])
+
+    def has_edge(self, edge: Edge) -> bool:
+        return self._find_edge_id(edge) is not None
+
+    def set_edge_attr(self, edge: Edge, key: str, value) -> None:
+        self._write_edge_attr(self._edge_id(edge), key, value)
+        self._modified(ChangeKind.EDGE_ATTR_CHANGED, (edge.a, edge.b), key)
+
+    def _write_edge_attr(self, edge_id: int, key: str, value) -> None:
+        if key == 'speed':
+            self._speed[edge_id] = value
+        elif key == 'length':
+            self._length[edge_id] = value
+        elif key == 'level':
+            self._level[edge_id] = value
+        elif key == 'station':
+            self._station[edge_id] = value
+        elif key == 'locked':
+            pass # left in old map files, locks are kept by SignallingService
+        else:
+            self._edge_extra.setdefault(edge_id, {})[key] = value
+
+    def has_edge_attr(self, edge: Edge, key: str) -> bool:
+        edge_id = self._edge_id(edge)
+        if key in _COLUMN_KEYS:
+            return True
+        if key == 'station':
+            return self._station[edge_id] != NO_STATION
+        return key in self._edge_extra.get(edge_id, ())
+
+    def get_edge_attr(self, edge: Edge, key: str) -> dict:
+        edge_id = self._edge_id(edge)
+        if key == 'station':
+            station = self._station[edge_id]
+            return None if station == NO_STATION else station
+        if key == 'speed':
+            return self._speed[edge_id]
+        if key == 'length':
+            return self._length[edge_id]
+        if key == 'level':
+            return self._level[edge_id]
+        return self._edge_extra.get(edge_id, {}).get(key, None)
+
+    def remove_edge_attr(self, edge: Edge, key: str) -> None:
+        edge_id = self._edge_id(edge)
+        if key == 'station':
+            if self._station[edge_id] == NO_STATION:
+                raise KeyError(key)
+            self._station[edge_id] = NO_STATION
+        else:
+            extra = self._edge_extra[edge_id]
+            del extra[key]
+            if not extra:
+                del self._edge_extra[edge_id]
+        self._modified(ChangeKind.EDGE_ATTR_CHANGED, (edge.a, edge.b), key)
+
+    def get_edge_length(self, edge: Edge) -> int:
+        return self._length[self._edge_id(edge)]
+
+    def get_edge_speed(self, edge: Edge) -> int:
+        return self._speed[self._edge_id(edge)]
+
+    def get_rail(self, edge: Edge) -> Rail:
+        edge_id = self._edge_id(edge)
+        return Rail(edge=edge, speed=self._speed[edge_id], length=self._length[edge_id])
+
+    def _edge_data(self, edge_id: int) -> dict:
+        data = {
+            'speed': self._speed[edge_id],
+            'length': self._length[edge_id],
+            'level': self._level[edge_id],
+        }
+        if self._station[edge_id] != NO_STATION:
+            data['station'] = self._station[edge_id]
+        if edge_id in self._edge_extra:
+            data.update(self._edge_extra[edge_id])
+        return data
+
+    def _build_edges_with_data(self) -> tuple[tuple[Edge, dict], ...]:
+        return tuple((self._edge_from_id(edge_id), self._edge_data(edge_id)) for edge_id in self._edge_ids.values())
+
+    def neighbors(self, node: Node) -> tuple[Node]:
+        node_id = self._node_ids[node]
+        id_to_node = self._id_to_node
+        source = self._source
+        target = self._target
+        return tuple(
+            id_to_node[target[edge_id] if source[edge_id] == node_id else source[edge_id]]
+            for edge_id in self._adjacency[node_id]
+        )
+
+    def add_edge(self, a: Node, b: Node, speed: int, length: int, level: int = 0) -> None:
+        self._insert_edge(a, b, speed, length, level)
+        self._modified(ChangeKind.EDGE_ADDED, (a, b))
+
+    def _insert_edge(self, a: Node, b: Node, speed: int, length: int, level: int) -> int:
+        a_id = self._ensure_node(a)
+        b_id = self._ensure_node(b)
+        key = self._key(a_id, b_id)
+        edge_id = self._edge_ids.get(key)
+        if edge_id is not None:
+            self._speed[edge_id] = speed
+            self._length[edge_id] = length
+            self._level[edge_id] = level
+            return edge_id
+
+        if self._free_edges:
+            edge_id = self._free_edges.pop()
+            self._source[edge_id] = a_id
+            self._target[edge_id] = b_id
+            self._speed[edge_id] = speed
+            self._length[edge_id] = length
+            self._level[edge_id] = level
+            self._station[edge_id] = NO_STATION
+            self._live[edge_id] = 1
+        else:
+            edge_id = len(self._source)
+            self._source.append(a_id)
+            self._target.append(b_id)
+            self._speed.append(speed)
+            self._length.append(length)
+            self._level.append(level)
+            self._station.append(NO_STATION)
+            self._live.append(1)
+
+        self._edge_ids[key] = edge_id
+        self._adjacency[a_id].append(edge_id)
+        if b_id != a_id:
+            self._adjacency[b_id].append(edge_id)
+        return edge_id
+
+    def remove_edge(self, edge: Edge) -> None:
+        self._drop_edge(self._edge_id(edge))
+        self._modified(ChangeKind.EDGE_REMOVED, (edge.a, edge.b))
+
+    def _drop_edge(self, edge_id: int) -> None:
+        a_id = self._source[edge_id]
+        b_id = self._target[edge_id]
+        del self._edge_ids[self._key(a_id, b_id)]
+        self._adjacency[a_id].remove(edge_id)
+        if b_id != a_id:
+            self._adjacency[b_id].remove(edge_id)
+        self._edge_extra.pop(edge_id, None)
+        self._live[edge_id] = 0
+        self._free_edges.append(edge_id)
+
+    def get_edges(self, node: Node) -> list[tuple[Node, Node]]:
+        node_id = self._node_ids[node]
+        return [(node, self._id_to_node[self._other(edge_id, node_id)]) for edge_id in self._adjacency[node_id]]
+
+    def edge_columns(self) -> dict[str, array]:
+        """The edge columns themselves by edge id, for bulk queries over every edge without a copy.
+
+        'live' is 0 for the ids of removed edges, whose other entries are stale. 'source' and
+        'target' index the node columns. The arrays change with the graph, a buffer exported from
+        them (e.g. by numpy.frombuffer) must be released before the graph is edited again.
+        """
+        return {'source': self._source, 'target': self._target, 'speed': self._speed, 'length': self._length,
+                'level': self._level, 'station': self._station, 'live': self._live}
+
+    def node_columns(self) -> dict[str, array]:
+        """The node coordinate columns themselves by node id, see edge_columns."""
+        return {'x': self._x, 'y': self._y, 'level': self._node_level}
+
+
+    def to_dict(self) -> dict:
+        nodes = []
+        for node_id, node in enumerate(self._id_to_node):
+            if node is None:
+                continue
+            data = {key: value for key, value in self._node_data.get(node_id, {}).items() if key not in ('signal', 'blocked')}
+            data['id'] = node.to_dict()
+            nodes.append(data)
+
+        edges = []
+        for edge_id in self._edge_ids.values():
+            data = self._edge_data(edge_id)
+            data['source'] = self._id_to_node[self._source[edge_id]].to_dict()
+            data['target'] = self._id_to_node[self._target[edge_id]].to_dict()
+            edges.append(data)
+
+        return {'directed': False, 'multigraph': False, 'graph': {}, 'nodes': nodes, 'edges': edges}
+
+    @classmethod
+    def from_dict(cls, graph_data: dict, on_modified: Callable[[RailwayChange], None]) -> 'ArrayGraphAdapter':
+        instance = cls(on_modified)
+
+        for node in graph_data['nodes']:
+            node_id = instance._ensure_node(Node.from_dict(node['id']))
+            attrs = {key: value for key, value in node.items() if key != 'id'}
+            if attrs:
+                instance._node_data[node_id] = attrs
+
+        for edge in graph_data['edges']:
+            length = edge['length']
+            if length not in (Config.SHORT_SECTION_LENGTH, Config.LONG_SECTION_LENGTH):
+                length = Config.LONG_SECTION_LENGTH
+            edge_id = instance._insert_edge(
+                Node.from_dict(edge['source']),
+                Node.from_dict(edge['target']),
+                edge['speed'],
+                length,
+                edge.get('level', 0)
+            )
+            for key, value in edge.items():
+                if key not in ('source', 'target', 'length', *_COLUMN_KEYS):
+                    instance._write_edge_attr(edge_id, key, value)
+
+        return instance
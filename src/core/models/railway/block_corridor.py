@@ -0,0 +1,190 @@
+from collections import deque
+import heapq
+
+from core.models.geometry.node import Node
+from core.models.railway.occupancy_grid import BLOCK_SIZE, STATION_AREA, OccupancyGrid, block_of
+
+Block = tuple[int, int]
+
+# a step into a block costs 1 plus this times the share of its cells that are blocked
+_CROWDING_PENALTY = 1.0
+# blocks searched around the ones of the ends, a coarse route never strays further
+_SEARCH_MARGIN = 8
+_OPEN_LINK = {(0, 0)}  # two blocks with no blocked cells
+_AROUND = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy)  # offsets of the 8 neighbors of a cell or block
+
+
+class BlockGraph:
+    """Which free cells of neighboring blocks connect, for routing over blocks of cells.
+
+    The free cells of a block fall into groups connected within the block, steps between
+    cells go all 8 ways like track does. Routing goes from group to group where their cells
+    touch across the border of two blocks. Turns, signals and platforms are left to the search
+    within the blocks found. A block is labelled when first needed and again once any of its
+    cells changed, most blocks are empty and need no labels at all.
+    """
+    def __init__(self, grid: OccupancyGrid, level: int, blocking: int):
+        self._grid = grid
+        self._level = level
+        self._blocking = blocking  # flags that block a cell on the level, besides the station areas of the surface
+        # block -> version it was labelled at, group of each cell (None when all are free, -1 for blocked), blocked cells
+        self._labels: dict[Block, tuple[int, list[int] | None, int]] = {}
+        # (block, neighbor) -> versions of both they were linked at, pairs of groups touching across the border
+        self._links: dict[tuple[Block, Block], tuple[int, int, set[tuple[int, int]]]] = {}
+
+    def _block(self, block: Block) -> tuple[list[int] | None, int]:
+        version = self._grid.block_version(block)
+        cached = self._labels.get(block)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        cells = self._grid.lookup(self._level)
+        surface_cells = self._grid.lookup(0)
+        x0 = block[0] * BLOCK_SIZE
+        y0 = block[1] * BLOCK_SIZE
+        labels = [-1 if surface_cells(x0 + i, y0 + j) & STATION_AREA or cells(x0 + i, y0 + j) & self._blocking else 0
+                  for j in range(BLOCK_SIZE) for i in range(BLOCK_SIZE)]
+        blocked = labels.count(-1)
+        if blocked == 0:
+            self._labels[block] = (version, None, 0)
+            return None, 0
+
+        group = 0
+        for index in range(BLOCK_SIZE * BLOCK_SIZE):
+            if labels[index] != 0:
+                continue
+            group += 1
+            labels[index] = group
+            queue = deque([index])
+            while queue:
+                j, i = divmod(queue.popleft(), BLOCK_SIZE)
+                for dx, dy in _AROUND:
+                    ni = i + dx
+                    nj = j + dy
+                    if 0 <= ni < BLOCK_SIZE and 0 <= nj < BLOCK_SIZE and labels[nj * BLOCK_SIZE + ni] == 0:
+                        labels[nj * BLOCK_SIZE + ni] = group
+                        queue.append(nj * BLOCK_SIZE + ni)
+        self._labels[block] = (version, labels, blocked)
+        return labels, blocked
+
+    def vertex(self, node: Node) -> tuple[Block, int]:
+        """Block of the cell and its group of free cells within the block, -1 if the cell is blocked."""
+        block = block_of(node.x, node.y)
+        labels, _ = self._block(block)
+        if labels is None:
+            return block, 0
+        return block, labels[(node.y % BLOCK_SIZE) * BLOCK_SIZE + node.x % BLOCK_SIZE]
+
+    def _linked(self, block: Block, neighbor: Block) -> set[tuple[int, int]]:
+        """Pairs of groups of the two blocks with cells next to each other across their border."""
+        versions = (self._grid.block_version(block), self._grid.block_version(neighbor))
+        cached = self._links.get((block, neighbor))
+        if cached is not None and cached[:2] == versions:
+            return cached[2]
+        labels, _ = self._block(block)
+        neighbor_labels, _ = self._block(neighbor)
+        if labels is None and neighbor_labels is None:
+            return _OPEN_LINK
+        dx = neighbor[0] - block[0]
+        dy = neighbor[1] - block[1]
+        links = set()
+        x0 = block[0] * BLOCK_SIZE
+        y0 = block[1] * BLOCK_SIZE
+        for i, j in _border(dx, dy):
+            group = 0 if labels is None else labels[j * BLOCK_SIZE + i]
+            if group < 0:
+                continue
+            for sx in (-1, 0, 1):
+                for sy in (-1, 0, 1):
+                    x = x0 + i + sx
+                    y = y0 + j + sy
+                    if block_of(x, y) == neighbor:
+                        other = 0 if neighbor_labels is None else neighbor_labels[(y % BLOCK_SIZE) * BLOCK_SIZE + x % BLOCK_SIZE]
+                        if other >= 0:
+                            links.add((group, other))
+        self._links[block, neighbor] = (*versions, links)
+        return links
+
+    def corridor(self, start: Node, end: Node, margin: int) -> frozenset[Block] | None:
+        """Blocks along the cheapest route between the cells of start and end, widened by margin blocks.
+
+        None when the free cells around the end cannot be reached from the ones around the start
+        without leaving the blocks within _SEARCH_MARGIN of either end, e.g. around a long wall of stations.
+        """
+        first = self.vertex(start)
+        last = self.vertex(end)
+        if first[1] < 0 or last[1] < 0:
+            return None
+        min_x = min(first[0][0], last[0][0]) - _SEARCH_MARGIN
+        max_x = max(first[0][0], last[0][0]) + _SEARCH_MARGIN
+        min_y = min(first[0][1], last[0][1]) - _SEARCH_MARGIN
+        max_y = max(first[0][1], last[0][1]) + _SEARCH_MARGIN
+        area = BLOCK_SIZE * BLOCK_SIZE
+
+        def heuristic(vertex: tuple[Block, int]) -> int:
+            return max(abs(vertex[0][0] - last[0][0]), abs(vertex[0][1] - last[0][1]))
+
+        priority_queue = [(heuristic(first), first)]
+        came_from: dict[tuple[Block, int], tuple[Block, int]] = {}
+        g_score = {first: 0.0}
+        done = set()
+        while priority_queue:
+            _, vertex = heapq.heappop(priority_queue)
+            if vertex == last:
+                break
+            if vertex in done:
+                continue
+            done.add(vertex)
+            block, group = vertex
+            for dx, dy in _AROUND:
+                neighbor = (block[0] + dx, block[1] + dy)
+                if not (min_x <= neighbor[0] <= max_x and min_y <= neighbor[1] <= max_y):
+                    continue
+                _, blocked = self._block(neighbor)
+                for own, other in self._linked(block, neighbor):
+                    neighbor_vertex = (neighbor, other)
+                    if own != group or neighbor_vertex in done:
+                        continue
+                    tentative_g_score = g_score[vertex] + 1.0 + _CROWDING_PENALTY * blocked / area
+                    if neighbor_vertex not in g_score or tentative_g_score < g_score[neighbor_vertex]:
+                        came_from[neighbor_vertex] = vertex
+                        g_score[neighbor_vertex] = tentative_g_score
+                        heapq.heappush(priority_queue, (tentative_g_score + heuristic(neighbor_vertex), neighbor_vertex))
+        else:
+            return None
+
+        route = [last[0]]
+        vertex = last
+        while vertex in came_from:
+            vertex = came_from[vertex]
+            route.append(vertex[0])
+        return frozenset((x + dx, y + dy) for x, y in route
+                         for dx in range(-margin, margin + 1) for dy in range(-margin, margin + 1))
+
+    def distances(self, origin: Node, blocks: frozenset[Block]) -> dict[tuple[int, int], int]:
+        """Steps to the free cells of the blocks from the origin through free cells of the blocks, for cells that connect."""
+        labels = {block: self._block(block)[0] for block in blocks}
+        distances = {(origin.x, origin.y): 0}
+        queue = deque(distances)
+        while queue:
+            x, y = queue.popleft()
+            steps = distances[x, y] + 1
+            for dx, dy in _AROUND:
+                cell = (x + dx, y + dy)
+                if cell in distances:
+                    continue
+                block = (cell[0] // BLOCK_SIZE, cell[1] // BLOCK_SIZE)
+                if block not in labels:
+                    continue
+                block_labels = labels[block]
+                if block_labels is None or block_labels[(cell[1] % BLOCK_SIZE) * BLOCK_SIZE + cell[0] % BLOCK_SIZE] >= 0:
+                    distances[cell] = steps
+                    queue.append(cell)
+        return distances
+
+
+def _border(dx: int, dy: int) -> list[tuple[int, int]]:
+    """Cells of a block, as (column, row), next to its neighbor in that direction."""
+    last = BLOCK_SIZE - 1
+    columns = [last] if dx > 0 else [0] if dx < 0 else range(BLOCK_SIZE)
+    rows = [last] if dy > 0 else [0] if dy < 0 else range(BLOCK_SIZE)
+    return [(i, j) for i in columns for j in rows]
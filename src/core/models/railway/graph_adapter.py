@@ -5,12 +5,43 @@ from typing import Callable
 from core.models.rail import Rail
 from core.models.geometry.pose import Pose
 from core.models.geometry.node import Node
+from core.models.railway.railway_change import ChangeKind, RailwayChange
 from core.config.config import Config
 
 class GraphAdapter:
-    def __init__(self, on_modified: Callable):
-        self._graph = nx.Graph()
+    def __init__(self, on_modified: Callable[[RailwayChange], None]):
         self._on_modified = on_modified
+        self._version = 0
+        self._blocks_version = 0
+        self._views: dict[str, tuple[int, object]] = {}
+        self._init_storage()
+        
+    def _init_storage(self) -> None:
+        """Create the empty structures the nodes and edges are kept in."""
+        self._graph = nx.Graph()
+        
+    @property
+    def version(self) -> int:
+        """Modification counter, increases whenever the saved state of the graph changes."""
+        return self._version
+    
+    @property
+    def blocks_version(self) -> int:
+        """Increases whenever a node is blocked or unblocked, blocks are not part of the saved state."""
+        return self._blocks_version
+    
+    def _modified(self, kind: ChangeKind, nodes: tuple[Node, ...], key: str | None = None) -> None:
+        self._version += 1
+        self._on_modified(RailwayChange(kind, nodes, key))
+        
+    def _cached_view(self, name: str, build: Callable):
+        """Materialize a view once per version and reuse it until the graph changes."""
+        cached = self._views.get(name)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        view = build()
+        self._views[name] = (self._version, view)
+        return view
         
     @property
     def nodes(self) -> set[Node]:
@@ -18,18 +49,22 @@ class GraphAdapter:
     
     @property
     def edges(self) -> frozenset[Edge]:
+        return self._cached_view('edges', self._build_edges)
+    
+    def _build_edges(self) -> frozenset[Edge]:
         return frozenset((Edge(*edge) for edge in self._graph.edges))
     
     def add_node(self, node: Node) -> None:
         self._graph.add_node(node)
-        self._on_modified()
+        self._modified(ChangeKind.NODE_ADDED, (node,))
         
     def has_node(self, node: Node) -> bool:
         return node in self._graph.nodes
     
     def remove_node(self, node: Node) -> None:
+        neighbors = self.neighbors(node)
         self._graph.remove_node(node)
-        self._on_modified()
+        self._modified(ChangeKind.NODE_REMOVED, (node, *neighbors))
     
     def has_node_attr(self, node: Node, key:str) -> bool:
         return key in self._graph.nodes[node]
@@ -39,24 +74,27 @@ class GraphAdapter:
     
     def set_node_attr(self, node: Node, key: str, value) -> None:
         self._graph.nodes[node][key] = value
-        self._on_modified()   
+        self._modified(ChangeKind.NODE_ATTR_CHANGED, (node,), key)
         
     def block_node(self, node: Node) -> None:
         self._graph.nodes[node]['blocked'] = True
+        self._blocks_version += 1
         # do not modify saved state
         
     def unblock_node(self, node: Node) -> None:
         del self._graph.nodes[node]['blocked']
+        self._blocks_version += 1
         
     def remove_blocked_nodes(self) -> None:
         blocked_nodes = [n for n, data in self._graph.nodes(data=True) if 'blocked' in data]
         for node in blocked_nodes:
             del self._graph.nodes[node]['blocked']
+        self._blocks_version += 1
         
     def remove_node_attr(self, node: Node, key: str) -> None:
         if node in self._graph.nodes and key in self._graph.nodes[node]:
             del self._graph.nodes[node][key]
-            self._on_modified()
+            self._modified(ChangeKind.NODE_ATTR_CHANGED, (node,), key)
     
     def all_nodes_with_attr(self, key: str) -> dict[Node, dict]:
         return {n: data[key] for n, data in self._graph.nodes(data=True) if key in data}
@@ -69,11 +107,7 @@ class GraphAdapter:
     
     def set_edge_attr(self, edge: Edge, key: str, value) -> None:
         self._graph.edges[edge][key] = value
-        self._on_modified()
-        
-    def set_edge_lock(self, edge: Edge, locked: bool) -> None:
-        self._graph.edges[edge]['locked'] = locked
-        # do not modify saved state
+        self._modified(ChangeKind.EDGE_ATTR_CHANGED, (edge.a, edge.b), key)
         
     def has_edge_attr(self, edge: Edge, key: str) -> bool:
         return key in self._graph.edges[edge]
@@ -83,7 +117,7 @@ class GraphAdapter:
     
     def remove_edge_attr(self, edge: Edge, key: str) -> None:
         del self._graph.edges[edge][key]
-        self._on_modified()
+        self._modified(ChangeKind.EDGE_ATTR_CHANGED, (edge.a, edge.b), key)
         
     def get_edge_length(self, edge: Edge) -> int:
         return self._graph.edges[edge]['length']
@@ -94,22 +128,25 @@ class GraphAdapter:
     def get_rail(self, edge: Edge) -> Rail:
         return Rail(edge=edge, speed=self.get_edge_speed(edge), length=self.get_edge_length(edge))
 
-    def all_edges_with_data(self) -> list[tuple[Edge, dict]]:
-        return [(Edge(a, b), data) for a, b, data in self._graph.edges(data=True)]
+    def all_edges_with_data(self) -> tuple[tuple[Edge, dict], ...]:
+        return self._cached_view('edges_with_data', self._build_edges_with_data)
+    
+    def _build_edges_with_data(self) -> tuple[tuple[Edge, dict], ...]:
+        return tuple((Edge(a, b), data) for a, b, data in self._graph.edges(data=True))
 
     def neighbors(self, node: Node) -> tuple[Node]:
         return tuple(self._graph.neighbors(node))
 
     def add_edge(self, a: Node, b: Node, speed: int, length: int, level: int = 0) -> None:
         self._graph.add_edge(a, b, speed=speed, length=length, level=level)
-        self._on_modified()
+        self._modified(ChangeKind.EDGE_ADDED, (a, b))
 
     def remove_edge(self, edge: Edge) -> None:
         self._graph.remove_edge(edge.a, edge.b)
-        self._on_modified()
+        self._modified(ChangeKind.EDGE_REMOVED, (edge.a, edge.b))
         
-    def get_edges(self, node: Node) -> list[Edge]:
-        return self._graph.edges(node)
+    def get_edges(self, node: Node) -> list[tuple[Node, Node]]:
+        return list(self._graph.edges(node))
         
         
     def to_dict(self) -> dict:
@@ -131,18 +168,18 @@ class GraphAdapter:
         return graph_data
     
     @classmethod
-    def from_dict(cls, graph_data: dict, on_modified: Callable) -> 'GraphAdapter':
+    def from_dict(cls, graph_data: dict, on_modified: Callable[[RailwayChange], None]) -> 'GraphAdapter':
         instance = cls(on_modified)
         
+        # built by hand, node_link_graph would flatten the tuple-backed nodes into plain tuples
         for node in graph_data['nodes']:
-            node['id'] = Node.from_dict(node['id'])
-            
+            attrs = {key: value for key, value in node.items() if key != 'id'}
+            instance._graph.add_node(Node.from_dict(node['id']), **attrs)
+
         for edge in graph_data['edges']:
-            edge['source'] = Node.from_dict(edge['source'])
-            edge['target'] = Node.from_dict(edge['target'])
-            if edge["length"] not in (Config.SHORT_SECTION_LENGTH, Config.LONG_SECTION_LENGTH):
-                edge["length"] = Config.LONG_SECTION_LENGTH
+            attrs = {key: value for key, value in edge.items() if key not in ('source', 'target')}
+            if attrs["length"] not in (Config.SHORT_SECTION_LENGTH, Config.LONG_SECTION_LENGTH):
+                attrs["length"] = Config.LONG_SECTION_LENGTH
+            instance._graph.add_edge(Node.from_dict(edge['source']), Node.from_dict(edge['target']), **attrs)
 
-        instance._graph = nx.node_link_graph(graph_data, edges="edges")
-        
         return instance
\ No newline at end of file
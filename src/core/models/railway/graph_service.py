@@ -1,10 +1,12 @@
 from core.config.config import Config
+from core.models.geometry.direction import Direction
 from core.models.geometry.node import Node
 from core.models.geometry.position import Position
 from core.models.geometry.pose import Pose
 from collections import deque
 from core.models.geometry.edge import Edge
 from core.config.config import Config
+from core.models.railway.railway_change import ChangeKind, RailwayChange
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from core.models.railway.railway_system import RailwaySystem
@@ -12,8 +14,15 @@ if TYPE_CHECKING:
 class GraphService:
     def __init__(self, railway: 'RailwaySystem'):
         self._railway = railway
+        self._junctions: set[Node] | None = set()
+        self._successors: dict[Node, dict[Direction, tuple[Pose, ...]]] = {}  # node -> heading -> turn neighbors
+        railway.subscribe_to_modifications(self._on_railway_modified)
 
     def is_junction(self, node: Node) -> bool:
+        return node in self.junctions
+    
+    def _compute_is_junction(self, node: Node) -> bool:
+        if not self._railway.graph.has_node(node): return False
         if self._railway.graph.degree_at(node) > 2: return True
         if self._railway.graph.degree_at(node) < 2: return False
 
@@ -30,10 +39,39 @@ class GraphService:
         return neighbors[0].direction_to(node) != node.direction_to(neighbors[1])
     
     @property
-    def junctions(self) -> list[Node]:
-        return [n for n in self._railway.graph.nodes if self.is_junction(n)]
+    def junctions(self) -> set[Node]:
+        """Junction nodes, maintained incrementally from graph changes. Do not mutate."""
+        if self._junctions is None:
+            self._junctions = {n for n in self._railway.graph.nodes if self._compute_is_junction(n)}
+        return self._junctions
+    
+    def _on_railway_modified(self, change: RailwayChange) -> None:
+        if change.kind == ChangeKind.RESET:
+            self._junctions = None # the whole graph was replaced, index it lazily from scratch
+            self._successors.clear()
+        elif change.is_topology_change:
+            nodes = {node for c in change.flatten() if c.is_topology_change for node in c.nodes}
+            for node in nodes:
+                # the turn neighbors of a node only depend on its own edges
+                self._successors.pop(node, None)
+                if self._junctions is None:
+                    continue
+                if self._compute_is_junction(node):
+                    self._junctions.add(node)
+                else:
+                    self._junctions.discard(node)
     
     def get_turn_neighbors(self, pose: Pose) -> tuple[Pose]:
+        """Poses a train can move on to from the pose, filled in lazily per node and heading."""
+        headings = self._successors.get(pose.node)
+        if headings is None:
+            headings = self._successors[pose.node] = {}
+        successors = headings.get(pose.direction)
+        if successors is None:
+            successors = headings[pose.direction] = self._compute_turn_neighbors(pose)
+        return successors
+    
+    def _compute_turn_neighbors(self, pose: Pose) -> tuple[Pose]:
         connections = []
         graph_neighbors = self._railway.graph.neighbors(pose.node)
         for neighbor_pose in pose.get_connecting_poses(other_level=True):
@@ -43,25 +81,33 @@ class GraphService:
         return tuple(connections)
 
     def remove_section(self, edges: list[Edge]) -> None:      
-        for edge in edges:
-            self._railway.graph.remove_edge(edge)
-            train_id = self._railway.trains.get_train_on_edge(edge)
-            if train_id:
-                self._railway.trains.remove(train_id)
+        touched: dict[Node, None] = {}
+        with self._railway.batch():
+            for edge in edges:
+                self._railway.graph.remove_edge(edge)
+                touched[edge.a] = touched[edge.b] = None
+                train_id = self._railway.trains.get_train_on_edge(edge)
+                if train_id:
+                    self._railway.trains.remove(train_id)
 
-        for node in list(self._railway.graph.nodes):
-            if self._railway.graph.degree_at(node) == 0:
-                self._railway.graph.remove_node(node)
-            elif self._railway.graph.degree_at(node) == 1 and self._railway.signals.has(node):
-                self._railway.signals.set(Pose(node, (self._railway.graph.neighbors(node)[0]).direction_to(node)))
+            # only endpoints of removed edges can have become orphans or dead ends
+            for node in touched:
+                if not self._railway.graph.has_node(node):
+                    continue
+                if self._railway.graph.degree_at(node) == 0:
+                    self._railway.graph.remove_node(node)
+                elif self._railway.graph.degree_at(node) == 1 and self._railway.signals.has(node):
+                    self._railway.signals.set(Pose(node, (self._railway.graph.neighbors(node)[0]).direction_to(node)))
 
     def add_section(self, nodes: list[Node], speed: int, length: int) -> None:
-        for a, b in zip(nodes[:-1], nodes[1:]):
-            self._railway.graph.add_edge(a, b, speed=speed, length=length)
+        with self._railway.batch():
+            for a, b in zip(nodes[:-1], nodes[1:]):
+                self._railway.graph.add_edge(a, b, speed=speed, length=length)
             
     def add_tunnel_section(self, nodes: list[Node], speed: int, length: int) -> None:
-        for a, b in zip(nodes[:-1], nodes[1:]):
-            self._railway.graph.add_edge(a, b, speed=speed, length=length, level=1)
+        with self._railway.batch():
+            for a, b in zip(nodes[:-1], nodes[1:]):
+                self._railway.graph.add_edge(a, b, speed=speed, length=length, level=1)
             
     def is_station_blocked_by_node(self, station_pos: Node) -> bool:
         return any(node_pos.is_within_station_rect(station_pos) for node_pos in self._railway.graph.nodes)
@@ -0,0 +1,167 @@
+from collections import Counter
+
+from core.config.config import Config
+from core.models.geometry.direction import Direction
+from core.models.geometry.node import Node
+from core.models.railway.railway_change import ChangeKind, RailwayChange
+from typing import TYPE_CHECKING, Callable
+if TYPE_CHECKING:
+    from core.models.railway.railway_system import RailwaySystem
+
+# cell flags, STATION_AREA is only kept on the surface and covers both levels
+STATION_AREA = 1
+TRACK = 2  # there is a node on this level
+PLATFORM = 4
+TUNNEL_ENTRY = 8
+SIGNAL = 16
+_AXIS_SHIFT = 5  # two bits above SIGNAL hold the axis of the signal
+_AXIS_MASK = 3 << _AXIS_SHIFT
+
+_GROWTH_MARGIN = 16  # cells added around the bounds when a layer has to grow
+BLOCK_SIZE = 16  # side of the square blocks of cells coarse routing works with
+
+_AXES: dict[Direction, int] = {}
+for _axis, (_dx, _dy) in enumerate(((1, 0), (0, 1), (1, 1), (1, -1))):
+    _AXES[Direction(_dx, _dy)] = _AXES[Direction(-_dx, -_dy)] = _axis
+
+
+def axis_of(direction: Direction) -> int:
+    """The line a direction runs along, the same for a direction and its opposite."""
+    return _AXES[direction]
+
+
+def block_of(x: int, y: int) -> tuple[int, int]:
+    return x // BLOCK_SIZE, y // BLOCK_SIZE
+
+
+def signal_axis(flags: int) -> int:
+    """Axis of the signal in a cell whose flags have SIGNAL set."""
+    return (flags & _AXIS_MASK) >> _AXIS_SHIFT
+
+
+class _Layer:
+    """Flags of one level in a row-major bytearray, cells outside the bounds read as 0."""
+    def __init__(self):
+        self.x0 = 0
+        self.y0 = 0
+        self.width = 0
+        self.height = 0
+        self.cells = bytearray()
+
+    def get(self, x: int, y: int) -> int:
+        i = x - self.x0
+        j = y - self.y0
+        if 0 <= i < self.width and 0 <= j < self.height:
+            return self.cells[j * self.width + i]
+        return 0
+
+    def set(self, x: int, y: int, flags: int) -> None:
+        i = x - self.x0
+        j = y - self.y0
+        if not (0 <= i < self.width and 0 <= j < self.height):
+            if not flags:
+                return
+            self._grow(x, y)
+            i = x - self.x0
+            j = y - self.y0
+        self.cells[j * self.width + i] = flags
+
+    def _grow(self, x: int, y: int) -> None:
+        if not self.width:
+            x0, y0, x1, y1 = x, y, x + 1, y + 1
+        else:
+            x0 = min(self.x0, x)
+            y0 = min(self.y0, y)
+            x1 = max(self.x0 + self.width, x + 1)
+            y1 = max(self.y0 + self.height, y + 1)
+        x0 -= _GROWTH_MARGIN
+        y0 -= _GROWTH_MARGIN
+        width = x1 - x0 + _GROWTH_MARGIN
+        height = y1 - y0 + _GROWTH_MARGIN
+        cells = bytearray(width * height)
+        for j in range(self.height):
+            start = (j + self.y0 - y0) * width + self.x0 - x0
+            cells[start:start + self.width] = self.cells[j * self.width:(j + 1) * self.width]
+        self.x0, self.y0, self.width, self.height, self.cells = x0, y0, width, height, cells
+
+
+class OccupancyGrid:
+    """Per-cell facts the track drawing search asks about, kept up to date from railway changes.
+
+    Station rectangles, track, platform nodes, tunnel entries and signal axes are flags in
+    one byte per cell, so a blocked check is an index into a bytearray instead of repository
+    calls or a scan over every station.
+    """
+    def __init__(self, railway: 'RailwaySystem'):
+        self._railway = railway
+        self._layers: dict[int, _Layer] = {0: _Layer(), 1: _Layer()}
+        self._block_versions: Counter[tuple[int, int]] = Counter()  # block -> changes to any of its cells on either level
+        railway.subscribe_to_modifications(self._on_railway_modified)
+
+    def flags(self, node: Node) -> int:
+        return self._layers[node.level].get(node.x, node.y)
+    
+    def lookup(self, level: int) -> Callable[[int, int], int]:
+        """Flags of a level by (x, y), for searches that read many cells. Stale after a RESET."""
+        return self._layers[level].get
+
+    def is_station_area(self, node: Node) -> bool:
+        """Whether the cell lies in a station rectangle, on either level."""
+        return bool(self._layers[0].get(node.x, node.y) & STATION_AREA)
+
+    def block_version(self, block: tuple[int, int]) -> int:
+        """Changes whenever a cell of the block changes, on either level."""
+        return self._block_versions[block]
+
+    def _on_railway_modified(self, change: RailwayChange) -> None:
+        if change.kind is ChangeKind.RESET:
+            self._rebuild()
+            return
+        for c in change.flatten():
+            if c.kind is ChangeKind.STATION_CHANGED:
+                for center in c.nodes:
+                    self._refresh_station_area(center)
+            elif c.is_topology_change or c.key in ('station', 'signal'):
+                for node in c.nodes:
+                    self._refresh_node(node)
+
+    def _rebuild(self) -> None:
+        self._layers = {0: _Layer(), 1: _Layer()}
+        for block in self._block_versions:
+            self._block_versions[block] += 1  # cells that were set before are clear now
+        for node in self._railway.graph.nodes:
+            self._refresh_node(node)
+        for station in self._railway.stations.all():
+            self._refresh_station_area(station.node)
+
+    def _refresh_node(self, node: Node) -> None:
+        layer = self._layers[node.level]
+        flags = layer.get(node.x, node.y) & STATION_AREA
+        if self._railway.graph.has_node(node):
+            flags |= TRACK
+        if self._railway.stations.is_node_platform(node):
+            flags |= PLATFORM
+        if self._railway.graph_service.is_tunnel_entry(node):
+            flags |= TUNNEL_ENTRY
+        signal = self._railway.signals.get(node)
+        if signal is not None:
+            flags |= SIGNAL | axis_of(signal.direction) << _AXIS_SHIFT
+        self._set(node.level, node.x, node.y, flags)
+
+    def _refresh_station_area(self, center: Node) -> None:
+        """Recompute the area flag under the rectangle of a station centered there, stations may have moved away."""
+        layer = self._layers[0]
+        half_width = Config.STATION_RECT_WIDTH // 2
+        half_height = Config.STATION_RECT_HEIGHT // 2
+        for x in range(center.x - half_width, center.x + half_width + 1):
+            for y in range(center.y - half_height, center.y + half_height + 1):
+                flags = layer.get(x, y) & ~STATION_AREA
+                if self._railway.stations.is_within_any(Node(x, y)):
+                    flags |= STATION_AREA
+                self._set(0, x, y, flags)
+
+    def _set(self, level: int, x: int, y: int, flags: int) -> None:
+        layer = self._layers[level]
+        if layer.get(x, y) != flags:
+            self._block_versions[block_of(x, y)] += 1
+            layer.set(x, y, flags)
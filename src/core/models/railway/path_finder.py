@@ -1,135 +1,210 @@
+from dataclasses import dataclass
+
 from core.models.geometry.direction import Direction
 from core.models.geometry.edge import Edge
 from core.models.geometry.node import Node
 from core.models.geometry.pose import Pose
-import heapq
+from core.models.railway.block_corridor import BlockGraph
+from core.models.railway.occupancy_grid import (
+    PLATFORM, SIGNAL, STATION_AREA, TRACK, TUNNEL_ENTRY, OccupancyGrid, axis_of, block_of, signal_axis,
+)
+from core.models.railway.preview_search import PreviewSearch
+from core.models.railway.railway_change import RailwayChange
+import math
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Iterator
 
 if TYPE_CHECKING:
     from core.models.railway.railway_system import RailwaySystem
 
+_MAX_DETOUR = 20  # searched cell by cell, longer detours are routed over blocks of cells first
+_CORRIDOR_MARGIN = 1  # blocks kept on either side of a coarse route for the fine search
+# cost past the steps around the blocked cells a detour over blocks may take, turns and the cells the search rules
+# out besides blocked ones add up to less, a search going further most likely finds no way at all
+_MAX_CORRIDOR_DETOUR = 2 * _MAX_DETOUR
+# poses a query within a corridor may settle, the detours found take a few thousand, a tunnel exit the turns cannot
+# reach within the corridor would take the whole of it
+_MAX_CORRIDOR_SETTLED = 10_000
+# poses followed back from a tunnel exit, an exit with no more ways into it than this is walled in
+_MAX_POCKET = 64
+_ARRIVAL_DIRECTIONS = Direction(0, 0).get_valid_turns()  # track can reach a node heading any way
+
+
+@dataclass
+class _Detour:
+    """Search for targets past the detour limit, kept within a corridor of blocks."""
+    vertex: tuple[tuple[int, int], int]  # block and group of cells of the last target
+    corridor: frozenset[tuple[int, int]]
+    restricted: PreviewSearch
+
+
+@dataclass
+class _Search:
+    """A search from one start and the detour it took last, both carried over between targets."""
+    search: PreviewSearch
+    blocks: BlockGraph  # cells the search may not enter, for routing past the detour limit
+    detour: _Detour | None = None
+
 
 class PathFinder:
     def __init__(self, railway: 'RailwaySystem'):
         self._railway = railway
+        self._grid = OccupancyGrid(railway)
+        self._track_preview: _Search | None = None
+        self._tunnel_preview: _Search | None = None
+        self._block_graphs: dict[tuple[int, int], BlockGraph] = {}  # (level, blocking flags) -> graph
         railway.subscribe_to_modifications(self._on_railway_modified)
-        self._edge_blocked_cache: dict[Edge, bool] = {}
-        self._node_blocked_cache: dict[Node, bool] = {}
-        self._tunnel_edge_blocked_cache: dict[Edge, bool] = {}
-        self._tunnel_node_blocked_cache: dict[Node, bool] = {}
+
+    def _on_railway_modified(self, change: RailwayChange) -> None:
+        # the searches read blocked cells as they go, settled poses may have become blocked or freed
+        self._track_preview = None
+        self._tunnel_preview = None
         
     def is_node_blocked(self, node: Node) -> bool:
-        if node in self._node_blocked_cache:
-            return self._node_blocked_cache[node]
-        blocked = self._railway.stations.is_within_any(node) or self._railway.graph_service.is_tunnel_entry(node)
-        self._node_blocked_cache[node] = blocked
-        return blocked
-    
-    def _on_railway_modified(self) -> None:
-        self._edge_blocked_cache.clear()
-        self._node_blocked_cache.clear()
-        self._tunnel_edge_blocked_cache.clear()
-        self._tunnel_node_blocked_cache.clear()
+        return self._grid.is_station_area(node) or bool(self._grid.flags(node) & TUNNEL_ENTRY)
     
-    def find_grid_path(self, start: Pose, end: Node) -> tuple[Node] | None:       
-        def is_edge_blocked(edge: Edge) -> bool:
-            def _func(edge: Edge) -> bool:
-                if self._railway.graph.has_edge(edge.toggle_level()):
+    def _grid_checks(self, level: int) -> tuple[Callable[[Node], bool], Callable[[Node, Node], bool]]:
+        """Blocked node and blocked step checks for drawing track on a level."""
+        cells = self._grid.lookup(level)
+        other_level_cells = self._grid.lookup(1 - level)
+        surface_cells = self._grid.lookup(0)
+        
+        def is_node_blocked(node: Node) -> bool:
+            return bool(surface_cells(node.x, node.y) & STATION_AREA or cells(node.x, node.y) & TUNNEL_ENTRY)
+        
+        def is_edge_blocked(a: Node, b: Node) -> bool:
+            # crossing track on the other level, only worth asking the graph if both cells have some
+            if (other_level_cells(a.x, a.y) & TRACK and other_level_cells(b.x, b.y) & TRACK
+                    and self._railway.graph.has_edge(Edge(a, b).toggle_level())):
+                return True
+            
+            a_flags = cells(a.x, a.y)
+            b_flags = cells(b.x, b.y)
+            if (a_flags | b_flags) & SIGNAL:
+                axis = axis_of(a.direction_to(b))
+                if a_flags & SIGNAL and signal_axis(a_flags) != axis:
                     return True
-                
-                if self._railway.signals.has(edge.a):
-                    signal = self._railway.signals.get(edge.a)
-                    
-                    if edge.direction.opposite() not in (signal.direction, signal.direction.opposite()):
-                        return True
-                    
-                if self._railway.signals.has(edge.b):
-                    signal = self._railway.signals.get(edge.b)
-                    
-                    if edge.direction not in (signal.direction, signal.direction.opposite()):
-                        return True
-                    
-                    
-                if self._railway.stations.is_node_platform(edge.a):
-                    if edge.b not in self._railway.graph.neighbors(edge.a):
-                        return True
-                    
-                if self._railway.stations.is_node_platform(edge.b):
-                    if edge.a not in self._railway.graph.neighbors(edge.b):
-                        return True
-                
-                # check for diagonal platform cutting
-                if edge.is_diagonal() and self._railway.stations.is_edge_platform(Edge(Node(edge.a.x, edge.b.y), Node(edge.b.x, edge.a.y))):
+                if b_flags & SIGNAL and signal_axis(b_flags) != axis:
                     return True
-                return False
             
-            if edge in self._edge_blocked_cache:
-                return self._edge_blocked_cache[edge]
-            blocked = _func(edge)
-            self._edge_blocked_cache[edge] = blocked
-            return blocked
-        
-        if self.is_node_blocked(start.node) or self.is_node_blocked(end):
-            raise ValueError("Start or end node is blocked")
-
-        priority_queue: list[tuple[float, Pose]] = []
-        came_from: dict[Pose, Pose] = {}
-        g_score: dict[Pose, float] = {}
-        f_score: dict[Pose, float] = {}
-
-        g_score[start] = 0
-        f_score[start] = start.node.heuristic_to(end)
-        heapq.heappush(priority_queue, (f_score[start], start))
-
-        while priority_queue:
-            _, current_pose = heapq.heappop(priority_queue)
-
-            if current_pose.node == end:
-                path = [current_pose.node]
-
-                while current_pose in came_from:
-                    current_pose = came_from[current_pose]
-                    path.append(current_pose.node)
-
-                return tuple(reversed(path))
+            # a platform node only takes its own track
+            if (a_flags | b_flags) & PLATFORM and not self._railway.graph.has_edge(Edge(a, b)):
+                return True
             
-            for neighbor_pose in current_pose.get_connecting_poses():
-                if self.is_node_blocked(neighbor_pose.node):
+            # check for diagonal platform cutting
+            if (a.x != b.x and a.y != b.y and surface_cells(a.x, b.y) & TRACK and surface_cells(b.x, a.y) & TRACK
+                    and self._railway.stations.is_edge_platform(Edge(Node(a.x, b.y), Node(b.x, a.y)))):
+                return True
+            return False
+        return is_node_blocked, is_edge_blocked
+
+    def find_grid_path(self, start: Pose, end: Node) -> tuple[Node] | None:
+        """Cheapest track from the start pose to the end node, None if the blocks around both ends hold none."""
+        return self._grid_path(self._track_search(start), end)
+
+    def preview_grid_path(self, start: Pose, end: Node) -> tuple[Node] | None:
+        """find_grid_path for a preview following the cursor, the search is carried over between calls with the same start."""
+        if self._track_preview is None or self._track_preview.search.start != start:
+            self._track_preview = self._track_search(start)
+        return self._grid_path(self._track_preview, end)
+
+    def _track_search(self, start: Pose) -> _Search:
+        is_node_blocked, is_edge_blocked = self._grid_checks(start.node.level)
+        
+        def expand(pose: Pose) -> Iterator[tuple[Pose, float]]:
+            for neighbor_pose in pose.get_connecting_poses():
+                if is_node_blocked(neighbor_pose.node) or is_edge_blocked(pose.node, neighbor_pose.node):
                     continue
-                
-                if is_edge_blocked(Edge(current_pose.node, neighbor_pose.node)):
-                    continue                    
-                
-                cost = 1.0 if current_pose.direction == neighbor_pose.direction else 1.01 # slight penalty for turning
-                tentative_g_score = g_score[current_pose] + cost
-
-                if neighbor_pose not in g_score or tentative_g_score < g_score[neighbor_pose]:
-                    came_from[neighbor_pose] = current_pose
-                    g_score[neighbor_pose] = tentative_g_score
-                    f_score[neighbor_pose] = tentative_g_score + neighbor_pose.node.heuristic_to(end)
-                    if f_score[neighbor_pose] > f_score[start] + 20:
-                        return None
-
-                    heapq.heappush(priority_queue, (f_score[neighbor_pose], neighbor_pose))
-
-        return None
-    
-    
-    def find_tunnel_path(self, start: Pose, end: Pose) -> tuple[Node] | None:
-        def _is_node_blocked(node: Node) -> bool:
-            if node in self._tunnel_node_blocked_cache:
-                return self._tunnel_node_blocked_cache[node]
-            blocked = self._railway.stations.is_within_any(node) or self._railway.graph.has_node(node)
-            self._tunnel_node_blocked_cache[node] = blocked
-            return blocked
+                yield neighbor_pose, 1.0 if pose.direction == neighbor_pose.direction else 1.01 # slight penalty for turning
+        return _Search(PreviewSearch(start, expand, turn_cost=0.01), self._block_graph(start.node.level, TUNNEL_ENTRY))
+
+    def _grid_path(self, search: _Search, end: Node) -> tuple[Node] | None:
+        is_node_blocked, _ = self._grid_checks(search.search.start.node.level)
+        if is_node_blocked(search.search.start.node) or is_node_blocked(end):
+            raise ValueError("Start or end node is blocked")
+        
+        goals = frozenset(Pose(end, direction) for direction in _ARRIVAL_DIRECTIONS)
+        poses = self._find(search, end, goals)
+        return None if poses is None else tuple(pose.node for pose in poses)
+
+    def _block_graph(self, level: int, blocking: int) -> BlockGraph:
+        if (level, blocking) not in self._block_graphs:
+            self._block_graphs[level, blocking] = BlockGraph(self._grid, level, blocking)
+        return self._block_graphs[level, blocking]
+
+    def _find(self, search: _Search, target: Node, goals: frozenset[Pose]) -> tuple[Pose, ...] | None:
+        """Cheapest poses from the start of the search to any of the goals.
+
+        Targets are searched cell by cell within the detour limit first. Past it, e.g. around
+        a station in the way, they are routed over blocks of cells first and then cell by cell
+        within the blocks along the way, with a detour limit past the steps around the blocked
+        cells instead. That search is carried over too, for as long as the target stays in the
+        same corridor of blocks.
+        """
+        poses = search.search.find(target, goals, _MAX_DETOUR)
+        if poses is not None:
+            return poses
+        
+        vertex = search.blocks.vertex(target)
+        if search.detour is None or search.detour.vertex != vertex:
+            corridor = search.blocks.corridor(search.search.start.node, target, _CORRIDOR_MARGIN)
+            if corridor is None:
+                return None
+            if search.detour is None or search.detour.corridor != corridor:
+                search.detour = _Detour(vertex, corridor, self._restricted_search(search, corridor, target))
+            search.detour.vertex = vertex
+        restricted = search.detour.restricted
+        start = restricted.start.node
+        max_detour = restricted.distance(start, target) - start.heuristic_to(target) + _MAX_CORRIDOR_DETOUR
+        return restricted.find(target, goals, max_detour, _MAX_CORRIDOR_SETTLED)
+
+    def _is_walled_in(self, search: PreviewSearch, goal: Pose) -> bool:
+        """Whether the ways into the goal, followed back, run out within a few poses away from the start.
+        
+        A tunnel cannot run along track on the surface or through another tunnel, an exit in a
+        corner the turns cannot get into would otherwise only be found out by searching everything
+        within reach.
+        """
+        seen = {goal}
+        stack = [goal]
+        while stack:
+            pose = stack.pop()
+            if len(seen) > _MAX_POCKET or pose.node == search.start.node:
+                return False
+            node = pose.node.offset(pose.direction.opposite())
+            for direction in _ARRIVAL_DIRECTIONS:
+                previous = Pose(node, direction)
+                if (previous not in seen and pose.direction in direction.get_valid_turns()
+                        and any(neighbor_pose == pose for neighbor_pose, _ in search.expand(previous))):
+                    seen.add(previous)
+                    stack.append(previous)
+        return True
+
+    def _restricted_search(self, search: _Search, corridor: frozenset[tuple[int, int]], landmark: Node) -> PreviewSearch:
+        unrestricted = search.search
+        
+        def expand(pose: Pose) -> Iterator[tuple[Pose, float]]:
+            for neighbor_pose, cost in unrestricted.expand(pose):
+                if block_of(neighbor_pose.node.x, neighbor_pose.node.y) in corridor:
+                    yield neighbor_pose, cost
+        
+        # steps around the blocked cells from the first target, a node is at least the difference of its steps and the
+        # target's away from a target, close to exact while the target stays near the first one, the chebyshev distance
+        # alone ignores whatever made the detour necessary
+        from_landmark = search.blocks.distances(landmark, corridor)
         
-        def is_edge_blocked(edge: Edge) -> bool:
-            if edge in self._tunnel_edge_blocked_cache:
-                return self._tunnel_edge_blocked_cache[edge]
-            blocked = self._railway.graph.has_edge(edge.surface_level())
-            self._tunnel_edge_blocked_cache[edge] = blocked
-            return blocked
+        def distance(node: Node, target: Node) -> float:
+            node_steps = from_landmark.get((node.x, node.y))
+            target_steps = from_landmark.get((target.x, target.y))
+            if node_steps is None or target_steps is None:
+                return math.inf
+            return max(node.heuristic_to(target), abs(target_steps - node_steps))
+        return PreviewSearch(unrestricted.start, expand, unrestricted.turn_cost, distance)
+
+    def preview_tunnel_path(self, start: Pose, end: Pose) -> tuple[Node] | None:
+        """Cheapest tunnel from the start to the end pose on the surface, the search is carried over between calls with the same start."""
+        def is_node_blocked(node: Node) -> bool:
+            return self._grid.is_station_area(node) or self._railway.graph.has_node(node)
         
         entrance = start.get_next_in_direction().tunnel_level()
         
@@ -138,55 +213,26 @@ class PathFinder:
             return tuple([start.node, end.node])
         
         exit = end.get_previous_in_direction().tunnel_level()
+        if is_node_blocked(entrance.node) or is_node_blocked(exit.node):
+            return None
         
-        if _is_node_blocked(entrance.node) or _is_node_blocked(exit.node):
+        if self._tunnel_preview is None or self._tunnel_preview.search.start != entrance:
+            def expand(pose: Pose) -> Iterator[tuple[Pose, float]]:
+                for neighbor_pose in pose.get_connecting_poses():
+                    if is_node_blocked(neighbor_pose.node):
+                        continue
+                    edge = Edge(pose.node, neighbor_pose.node)
+                    if self._railway.graph.has_edge(edge.surface_level()):
+                        continue
+                    cost = 1.0 if pose.direction == neighbor_pose.direction else 1.1
+                    if self._railway.graph.has_edge(edge):
+                        cost += 5.0  # heavy penalty for reusing existing track
+                    yield neighbor_pose, cost
+            self._tunnel_preview = _Search(PreviewSearch(entrance, expand, turn_cost=0.1), self._block_graph(exit.node.level, TRACK))
+        if self._is_walled_in(self._tunnel_preview.search, exit):
             return None
-
-        priority_queue: list[tuple[float, Pose]] = []
-        came_from: dict[Pose, Pose] = {}
-        g_score: dict[Pose, float] = {}
-        f_score: dict[Pose, float] = {}
-
-        g_score[entrance] = 0
-        f_score[entrance] = entrance.node.heuristic_to(exit.node)
-        heapq.heappush(priority_queue, (f_score[entrance], entrance))
-
-        while priority_queue:
-            _, current_pose = heapq.heappop(priority_queue)
-                        
-            if current_pose == exit:
-                path = [end.node, current_pose.node]
-
-                while current_pose in came_from:
-                    current_pose = came_from[current_pose]
-                    path.append(current_pose.node)
-                    
-                path.append(start.node)
-
-                return tuple(reversed(path))
-            
-            for neighbor_pose in current_pose.get_connecting_poses():
-                if _is_node_blocked(neighbor_pose.node):
-                    continue
-                edge = Edge(current_pose.node, neighbor_pose.node)
-                if is_edge_blocked(edge):
-                    continue                    
-                
-                cost = 1.0
-                if current_pose.direction != neighbor_pose.direction:
-                    cost += 0.1
-                if self._railway.graph.has_edge(edge):
-                    cost += 5.0  # heavy penalty for reusing existing track
-                    
-                tentative_g_score = g_score[current_pose] + cost
-
-                if neighbor_pose not in g_score or tentative_g_score < g_score[neighbor_pose]:
-                    came_from[neighbor_pose] = current_pose
-                    g_score[neighbor_pose] = tentative_g_score
-                    f_score[neighbor_pose] = tentative_g_score + neighbor_pose.node.heuristic_to(exit.node)
-                    if f_score[neighbor_pose] > f_score[entrance] + 20:
-                        return None  # Path too long
-
-                    heapq.heappush(priority_queue, (f_score[neighbor_pose], neighbor_pose))
-
-        return None
\ No newline at end of file
+        
+        poses = self._find(self._tunnel_preview, exit.node, frozenset((exit,)))
+        if poses is None:
+            return None
+        return (start.node, *(pose.node for pose in poses), end.node)
@@ -0,0 +1,131 @@
+import heapq
+import math
+from typing import Callable, Iterable
+
+from core.models.geometry.direction import Direction
+from core.models.geometry.node import Node
+from core.models.geometry.pose import Pose
+
+# poses a search may settle before it is started over, previews dragged around for long should not grow without end
+_MAX_SETTLED = 50_000
+# scores are compared rounded, so sums of the same step costs in another order tie
+_SCORE_DIGITS = 6
+_MAX_TURNS = 4  # a turn changes the direction by 45 degrees, no target is more than this many turns away
+_ANGLES = {direction: math.atan2(direction.y, direction.x) for direction in Direction(0, 0).get_valid_turns()}
+
+
+def min_turns(pose: Pose, target: Node) -> int:
+    """Turns any track from the pose to the target takes at least."""
+    dx = target.x - pose.node.x
+    dy = target.y - pose.node.y
+    if pose.direction.is_zero() or (dx == 0 and dy == 0):
+        return 0
+    angle = abs(math.atan2(dy, dx) - _ANGLES[pose.direction])
+    angle = min(angle, 2 * math.pi - angle)
+    return math.ceil(angle / (math.pi / 4) - 1e-9)
+
+
+class PreviewSearch:
+    """A* from a fixed start that is kept between queries for different goals.
+
+    Step costs are at least 1 and the chebyshev heuristic changes by at most 1 per step, the
+    turns still needed drop by at most 1 per turn taken, so a pose the search has settled has
+    its exact cost from the start whatever goal it was settled for. A query for another goal
+    carries on from there, moving the goal by a cell costs the poses around it instead of a
+    whole search. The answer for the last goal is kept. The railway must not change while the
+    search is in use.
+
+    Like in D* Lite, the open poses are not re-scored when the goal moves. Every score from
+    then on is raised by the most the heuristic of any pose could have dropped, the old scores
+    stay low enough, and a pose whose score turns out to be out of date when it comes up is
+    put back with the current one. The distance may be anything that never overestimates the
+    steps left and drops by at most 1 per step, e.g. steps around known obstacles.
+
+    On open ground nearly every pose between start and goal is as far from the goal under the
+    chebyshev heuristic, counting the turns still needed and taking the pose furthest from the
+    start among those scoring the same has the search head for the goal instead of settling
+    all of them.
+    """
+    def __init__(self, start: Pose, expand: Callable[[Pose], Iterable[tuple[Pose, float]]], turn_cost: float = 0.0,
+                 distance: Callable[[Node, Node], float] = Node.heuristic_to):
+        self.start = start
+        self.expand = expand  # pose -> poses reachable in one step, with the cost of the step
+        self.turn_cost = turn_cost  # the least a step changing direction costs more than one going straight
+        # (node, target) -> steps the node is at least from the target, may be replaced before a query for another target
+        self.distance = distance
+        self._reset()
+
+    def _reset(self) -> None:
+        self._g_score: dict[Pose, float] = {self.start: 0.0}
+        self._came_from: dict[Pose, Pose] = {}
+        self._settled: set[Pose] = set()
+        self._open: list[tuple[float, float, Pose]] = [(0.0, 0.0, self.start)]  # (f score + offset, -g score, pose)
+        self._target: Node | None = None
+        self._offset = 0.0  # added to the f scores of the current target, grows as the target moves
+        self._last: tuple[frozenset[Pose], float, tuple[Pose, ...] | None] | None = None
+
+    def find(self, target: Node, goals: frozenset[Pose], max_detour: float, max_settled: float = math.inf) -> tuple[Pose, ...] | None:
+        """Cheapest poses from the start to any of the goals at the target node, None if it is longer than the detour allows.
+        
+        A query settling max_settled poses stops there with the goal it settled, if any, a search left off early
+        is still exact and carries on with the next query.
+        """
+        if self._last is not None and self._last[:2] == (goals, max_detour):
+            return self._last[2]
+        if len(self._settled) > _MAX_SETTLED:
+            self._reset()
+        if self._target is not None and target != self._target:
+            # no pose is closer to the new target than to the old one by more than the targets are apart
+            self._offset += self.distance(self._target, target) + self.turn_cost * _MAX_TURNS
+            if self._offset == math.inf:
+                self._reset()
+        self._target = target
+
+        g_score = self._g_score
+        came_from = self._came_from
+        settled = self._settled
+        priority_queue = self._open
+        offset = self._offset
+        limit = self.start.node.heuristic_to(target) + max_detour
+        best = min((pose for pose in goals if pose in settled), key=g_score.__getitem__, default=None)
+        settled_before = len(settled)
+        while priority_queue and len(settled) - settled_before < max_settled:
+            key, _, pose = priority_queue[0]
+            if pose in settled:
+                heapq.heappop(priority_queue)
+                continue # pushed again with a lower score and settled since
+            current_key = round(g_score[pose] + self._heuristic(pose, target) + offset, _SCORE_DIGITS)
+            if key < current_key:
+                heapq.heapreplace(priority_queue, (current_key, -g_score[pose], pose))
+                continue
+            f_score = key - offset
+            if f_score > limit or f_score == math.inf or (best is not None and g_score[best] <= f_score):
+                break
+            heapq.heappop(priority_queue)
+            settled.add(pose)
+            if pose in goals and (best is None or g_score[pose] < g_score[best]):
+                best = pose
+
+            for neighbor_pose, cost in self.expand(pose):
+                if neighbor_pose in settled:
+                    continue
+                tentative_g_score = g_score[pose] + cost
+                if neighbor_pose not in g_score or tentative_g_score < g_score[neighbor_pose]:
+                    came_from[neighbor_pose] = pose
+                    g_score[neighbor_pose] = tentative_g_score
+                    key = round(tentative_g_score + self._heuristic(neighbor_pose, target) + offset, _SCORE_DIGITS)
+                    heapq.heappush(priority_queue, (key, -tentative_g_score, neighbor_pose))
+
+        path = None
+        if best is not None and g_score[best] <= limit:
+            poses = [best]
+            while poses[-1] in came_from:
+                poses.append(came_from[poses[-1]])
+            path = tuple(reversed(poses))
+        self._last = (goals, max_detour, path)
+        return path
+
+    def _heuristic(self, pose: Pose, target: Node) -> float:
+        if self.turn_cost:
+            return self.distance(pose.node, target) + self.turn_cost * min_turns(pose, target)
+        return self.distance(pose.node, target)
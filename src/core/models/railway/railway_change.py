@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+from enum import Enum, auto
+
+from core.models.geometry.node import Node
+
+class ChangeKind(Enum):
+    NODE_ADDED = auto()
+    NODE_REMOVED = auto()
+    NODE_ATTR_CHANGED = auto()
+    EDGE_ADDED = auto()
+    EDGE_REMOVED = auto()
+    EDGE_ATTR_CHANGED = auto()
+    STATION_CHANGED = auto()
+    TIMETABLE_CHANGED = auto()
+    TRAIN_CHANGED = auto()
+    BATCH = auto()  # several changes committed together, see RailwayChange.changes
+    RESET = auto()  # everything may have changed, e.g. a map was loaded
+    RESTORED = auto()  # the simulation went back to a snapshot, the track is the same but trains, signals, locks and blocks may differ
+
+@dataclass(frozen=True)
+class RailwayChange:
+    """Describes a single modification of the railway for subscribers of RailwaySystem.
+
+    nodes holds the affected coordinates: the endpoints of an added or removed edge, the
+    node whose attribute changed, or the old and new centers of a station. A BATCH change
+    holds the union of its children's nodes and the children themselves in changes.
+    """
+    kind: ChangeKind
+    nodes: tuple[Node, ...] = ()
+    key: str | None = None
+    changes: tuple['RailwayChange', ...] = ()
+
+    @property
+    def is_topology_change(self) -> bool:
+        if self.kind == ChangeKind.BATCH:
+            return any(change.is_topology_change for change in self.changes)
+        return self.kind in (ChangeKind.NODE_ADDED, ChangeKind.NODE_REMOVED, ChangeKind.EDGE_ADDED, ChangeKind.EDGE_REMOVED)
+    
+    def flatten(self) -> tuple['RailwayChange', ...]:
+        """The individual changes, a batch yields its children and anything else yields itself."""
+        return self.changes if self.kind == ChangeKind.BATCH else (self,)
+
+    @classmethod
+    def merge(cls, changes: list['RailwayChange']) -> 'RailwayChange':
+        """Consolidate the changes collected during a batch into a single change."""
+        if len(changes) == 1:
+            return changes[0]
+        if any(change.kind == ChangeKind.RESET for change in changes):
+            return cls(ChangeKind.RESET)
+        nodes = dict.fromkeys(node for change in changes for node in change.nodes)
+        return cls(ChangeKind.BATCH, tuple(nodes), changes=tuple(changes))
@@ -0,0 +1,29 @@
+from dataclasses import dataclass
+
+from core.models.geometry.edge import Edge
+from core.models.geometry.node import Node
+from core.models.signal import Signal
+from core.models.timetable import Timetable
+from core.models.train import TrainSnapshot
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from core.models.railway.graph_adapter import GraphAdapter
+
+
+@dataclass(frozen=True)
+class RailwaySnapshot:
+    """In-memory state of a running simulation, see RailwaySystem.snapshot.
+
+    Only what the simulation changes is captured, the track itself is shared. A snapshot
+    holds references to the live trains, signals and timetables and is only valid for the
+    railway it was taken from, as long as the track is not edited.
+    """
+    graph: 'GraphAdapter'
+    graph_version: int
+    blocked: frozenset[Node]
+    time: float | None
+    trains: tuple[dict[int, TrainSnapshot], dict[Edge, int]]
+    signals: tuple[tuple[Signal, tuple], ...]
+    signalling: tuple[frozenset[Edge], dict]
+    timetables: tuple[tuple[Timetable, tuple[int, ...]], ...]
@@ -1,6 +1,12 @@
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from core.config.config import Config
 from core.models.time import Time
 from core.models.railway.graph_adapter import GraphAdapter
+from core.models.railway.array_graph_adapter import ArrayGraphAdapter
 from core.models.railway.graph_service import GraphService
+from core.models.railway.railway_change import ChangeKind, RailwayChange
+from core.models.railway.railway_snapshot import RailwaySnapshot
 from core.models.railway.path_finder import PathFinder
 from core.models.railway.signalling_service import SignallingService
 from core.models.repositories.station_repository import StationRepository
@@ -12,6 +18,8 @@ class RailwaySystem:
     def __init__(self):
         self._is_saved: bool = True
         self._modified_subscribers = []
+        self._batch_depth: int = 0
+        self._pending_changes: list[RailwayChange] = []
         self.time = Time()
         self._graph_adapter = GraphAdapter(on_modified=self.mark_modified)
         self._graph_service = GraphService(self)
@@ -22,13 +30,39 @@ class RailwaySystem:
         self._pathfinder = PathFinder(self)
         self._signalling_service = SignallingService(self)
     
-    def mark_modified(self) -> None:
+    def mark_modified(self, change: RailwayChange) -> None:
         self._is_saved = False
+        self._notify(change)
+        
+    def _notify(self, change: RailwayChange) -> None:
+        if self._batch_depth:
+            self._pending_changes.append(change)
+            return
         for callback in self._modified_subscribers:
-            callback()
+            callback(change)
+            
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Collect changes and notify subscribers once when the outermost batch ends.
+        
+        Derived indexes and caches are only brought up to date on commit, so do not rely on
+        them between mutations inside a batch.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._pending_changes:
+                change = RailwayChange.merge(self._pending_changes)
+                self._pending_changes = []
+                self._notify(change)
         
-    def subscribe_to_modifications(self, callback) -> None:
+    def subscribe_to_modifications(self, callback: Callable[[RailwayChange], None]) -> Callable[[], None]:
         self._modified_subscribers.append(callback)
+        def unsubscribe():
+            self._modified_subscribers.remove(callback)
+        return unsubscribe
     
     @property
     def is_saved(self) -> bool:
@@ -71,7 +105,43 @@ class RailwaySystem:
     
     def tick(self):
         for train in self._train_repository.all():
+            if train._idle_revision == train._revision:
+                continue # shut down or held at a signal, nothing changed since
             train.tick()
+            if train.is_idle():
+                train._idle_revision = train._revision
+        
+    def snapshot(self) -> RailwaySnapshot:
+        """Capture the simulation state: trains, signal connections, locks, auto-signals, blocked nodes, free start times and the clock."""
+        return RailwaySnapshot(
+            graph=self._graph_adapter,
+            graph_version=self._graph_adapter.version,
+            blocked=frozenset(self._graph_adapter.all_nodes_with_attr('blocked')),
+            time=self.time.current_time,
+            trains=self._train_repository.snapshot(),
+            signals=self._signal_repository.snapshot(),
+            signalling=self._signalling_service.snapshot(),
+            timetables=self._timetable_repository.snapshot(),
+        )
+        
+    def restore(self, snapshot: RailwaySnapshot) -> None:
+        """Return the simulation to a snapshot taken from this railway, the track must not have been edited since.
+        
+        Subscribers are notified with a RESTORED change afterwards.
+        """
+        if snapshot.graph is not self._graph_adapter or snapshot.graph_version != self._graph_adapter.version:
+            raise ValueError("The track was edited after the snapshot was taken.")
+        blocked = self._graph_adapter.all_nodes_with_attr('blocked').keys()
+        for node in blocked - snapshot.blocked:
+            self._graph_adapter.unblock_node(node)
+        for node in snapshot.blocked - blocked:
+            self._graph_adapter.block_node(node)
+        self._train_repository.restore(snapshot.trains)
+        self._signal_repository.restore(snapshot.signals)
+        self._signalling_service.restore(snapshot.signalling)
+        self._timetable_repository.restore(snapshot.timetables)
+        self.time.current_time = snapshot.time
+        self._notify(RailwayChange(ChangeKind.RESTORED))
 
     def to_dict(self) -> dict:
         return {
@@ -83,7 +153,9 @@ class RailwaySystem:
         }
     def replace_from_dict(self, data: dict) -> None:
         try:
-            self._graph_adapter = GraphAdapter.from_dict(data['graph'], on_modified=self.mark_modified)
+            large_map = len(data['graph']['edges']) >= Config.ARRAY_GRAPH_MIN_EDGES
+            graph_adapter_class = ArrayGraphAdapter if large_map else GraphAdapter
+            self._graph_adapter = graph_adapter_class.from_dict(data['graph'], on_modified=self.mark_modified)
             self._station_repository = StationRepository.from_dict(self, data["station_repository"])
             self._signal_repository = SignalRepository.from_dict(self, data["signal_repository"])
             self._timetable_repository = TimetableRepository.from_dict(self, data['timetable_repository'])
@@ -95,6 +167,8 @@ class RailwaySystem:
             self._signal_repository = SignalRepository(self)
             self._timetable_repository = TimetableRepository(self)
             self._train_repository = TrainRepository(self)
+            self._notify(RailwayChange(ChangeKind.RESET))
             raise e
         
+        self._notify(RailwayChange(ChangeKind.RESET))
         self.mark_as_saved()
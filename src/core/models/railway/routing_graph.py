@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+from core.models.geometry.node import Node
+from core.models.geometry.pose import Pose
+from core.models.railway.railway_change import ChangeKind, RailwayChange
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from core.models.railway.railway_system import RailwaySystem
+
+
+@dataclass(frozen=True)
+class RouteLeg:
+    """Track between two routing vertices with no choice on the way."""
+    poses: tuple[Pose, ...]  # every pose after the source vertex, the last one is the target vertex
+    costs: tuple[float, ...]  # what a search is charged from the source up to each pose, turns cost a little more
+
+
+class RoutingGraph:
+    """Condensed view of the track for route searches.
+
+    Vertices are poses where a search has something to decide: poses at signal nodes, poses
+    with more than one way on (facing junctions) and dead ends. Everything between two vertices
+    is a leg that a search takes whole. Legs are extracted lazily per vertex and dropped when
+    any node they cover is touched by a topology or signal change. Legs can be asked for from
+    any pose, a search may start between vertices.
+    """
+    def __init__(self, railway: 'RailwaySystem'):
+        self._railway = railway
+        self._legs: dict[Pose, tuple[RouteLeg, ...]] = {}
+        self._sources: dict[Node, set[Pose]] = {}  # node -> vertices with a leg covering it
+        railway.subscribe_to_modifications(self._on_railway_modified)
+
+    def _on_railway_modified(self, change: RailwayChange) -> None:
+        if change.kind is ChangeKind.RESET:
+            self._legs.clear()
+            self._sources.clear()
+            return
+        for c in change.flatten():
+            if c.is_topology_change or c.key == 'signal':
+                for node in c.nodes:
+                    for source in self._sources.pop(node, ()):
+                        self._legs.pop(source, None)
+
+    def _is_vertex(self, pose: Pose) -> bool:
+        if self._railway.signals.has(pose.node):
+            return True
+        return len(self._railway.graph_service.get_turn_neighbors(pose)) != 1
+
+    def legs(self, vertex: Pose) -> tuple[RouteLeg, ...]:
+        """Legs leaving a pose, one per way on."""
+        if vertex in self._legs:
+            return self._legs[vertex]
+        legs: list[RouteLeg] = []
+        covered = {vertex.node}
+        for pose in self._railway.graph_service.get_turn_neighbors(vertex):
+            leg = self._walk(vertex, pose)
+            if leg is not None:
+                legs.append(leg)
+                covered.update(p.node for p in leg.poses)
+        self._legs[vertex] = tuple(legs)
+        for node in covered:
+            self._sources.setdefault(node, set()).add(vertex)
+        return self._legs[vertex]
+
+    def _walk(self, vertex: Pose, pose: Pose) -> RouteLeg | None:
+        poses = [pose]
+        costs = [1.0 if vertex.direction == pose.direction else 1.01]
+        seen = {pose}
+        while not self._is_vertex(pose):
+            following = self._railway.graph_service.get_turn_neighbors(pose)[0]
+            if following in seen:
+                return None # a loop with no signal or junction on it, a search could never leave it
+            costs.append(costs[-1] + (1.0 if pose.direction == following.direction else 1.01))
+            pose = following
+            poses.append(pose)
+            seen.add(pose)
+        return RouteLeg(tuple(poses), tuple(costs))
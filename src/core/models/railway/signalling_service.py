@@ -1,8 +1,11 @@
+from collections import Counter
 import heapq
 from core.models.geometry.edge import Edge
 from core.models.geometry.node import Node
 from core.models.geometry.pose import Pose
 from core.models.signal import Signal
+from core.models.railway.railway_change import ChangeKind, RailwayChange
+from core.models.railway.routing_graph import RouteLeg, RoutingGraph
 from typing import TYPE_CHECKING, Callable
 
 if TYPE_CHECKING:
@@ -12,13 +15,70 @@ class SignallingService:
     auto_signals: dict[Pose, Signal, tuple[Edge]] = {}
     def __init__(self, railway: 'RailwaySystem'):
         self._railway = railway
+        self._locked_edges: set[Edge] = set()  # sorted
+        self._locked_nodes: Counter[Node] = Counter()  # node -> locked edges ending at it
+        self.releases = 0  # edge locks released so far, a route that was blocked may be free once this changes
+        self.lock_version = 0  # increases on every lock change, routes found before may no longer be free
+        self._routing = RoutingGraph(railway)
+        self._previews: dict[tuple[Pose, Pose], frozenset[Edge]] = {}  # (start, end) -> route, for _previews_version
+        self._previews_version: tuple[int, int] = (0, 0)  # lock and block versions the previews were found at
+        railway.subscribe_to_modifications(self._on_railway_modified)
+        
+    def _on_railway_modified(self, change: RailwayChange) -> None:
+        self._previews.clear()
+        if change.kind is ChangeKind.RESET:
+            # a loaded graph has no locks
+            self._locked_edges.clear()
+            self._locked_nodes.clear()
+            return
+        for c in change.flatten():
+            # a lock goes away with its edge, a removed node takes its edges to the listed neighbors
+            if c.kind is ChangeKind.EDGE_REMOVED:
+                removed = [Edge(*c.nodes)]
+            elif c.kind is ChangeKind.NODE_REMOVED:
+                removed = [Edge(c.nodes[0], neighbor) for neighbor in c.nodes[1:]]
+            else:
+                continue
+            for edge in removed:
+                if edge in self._locked_edges:
+                    self._set_edge_lock(edge, False)
         
     def reset(self) -> None:
         self.auto_signals.clear()
         
+    def _set_edge_lock(self, edge: Edge, locked: bool) -> None:
+        if locked:
+            if edge not in self._locked_edges:
+                self.lock_version += 1
+                self._locked_edges.add(edge.sorted())
+                self._locked_nodes[edge.a] += 1
+                self._locked_nodes[edge.b] += 1
+        else:
+            if edge in self._locked_edges:
+                self._locked_edges.remove(edge)
+                for node in edge:
+                    self._locked_nodes[node] -= 1
+                    if not self._locked_nodes[node]:
+                        del self._locked_nodes[node]
+                self.releases += 1
+                self.lock_version += 1
+        
+    def snapshot(self) -> tuple[frozenset[Edge], dict]:
+        return frozenset(self._locked_edges), dict(self.auto_signals)
+    
+    def restore(self, snapshot: tuple[frozenset[Edge], dict]) -> None:
+        """Return to a snapshot, only the edges whose lock differs are touched."""
+        locked_edges, auto_signals = snapshot
+        for edge in self._locked_edges - locked_edges:
+            self._set_edge_lock(edge, False)
+        for edge in locked_edges - self._locked_edges:
+            self._set_edge_lock(edge, True)
+        self.auto_signals.clear()
+        self.auto_signals.update(auto_signals)
+        
     def lock_path(self, edges: list[Edge]) -> None:
         for edge in edges:
-            self._railway.graph.set_edge_lock(edge, True)
+            self._set_edge_lock(edge, True)
             
     def release_path(self, edges: list[Edge]) -> None:
         if not edges:
@@ -26,10 +86,10 @@ class SignallingService:
         for edge in edges:
             if self._railway.signals.has_with_pose(Pose.from_nodes(edge.a, edge.b).get_previous_in_direction()):
                 return
-            self._railway.graph.set_edge_lock(edge, False)
+            self._set_edge_lock(edge, False)
     
     def passed(self, edge: Edge):
-        self._railway.graph.set_edge_lock(edge, False)
+        self._set_edge_lock(edge, False)
         signal = self._railway.signals.get(edge.b)
         if signal is not None and signal.direction == edge.direction:
             signal.passed()
@@ -42,33 +102,45 @@ class SignallingService:
     def lock_paths_under_trains(self) -> None:
         for train in self._railway.trains.all():
             for rail in train.get_occupied_rails():
-                self._railway.graph.set_edge_lock(rail.edge, True)
+                self._set_edge_lock(rail.edge, True)
                 
     def unlock_all_paths(self) -> None:
-        for edge in self._railway.graph.edges:
-            self._railway.graph.set_edge_lock(edge, False)
+        if not self._locked_edges:
+            return
+        self._locked_edges.clear()
+        self._locked_nodes.clear()
+        self.releases += 1
+        self.lock_version += 1
         
     def is_edge_locked(self, edge: Edge) -> bool:
-        return self._railway.graph.get_edge_attr(edge, 'locked') is True
+        return edge in self._locked_edges
     
     def is_node_locked(self, node: Node) -> bool:
-        return any(self.is_edge_locked(Edge(node, neighbor)) for neighbor in self._railway.graph.neighbors(node))
+        return node in self._locked_nodes
 
     def drop_signal(self, signal: Signal) -> None:
         for edge in signal.path:
-            self._railway.graph.set_edge_lock(edge, False)
+            self._set_edge_lock(edge, False)
         signal.drop()
         if signal.pose in self.auto_signals:
             del self.auto_signals[signal.pose]
     
-    def get_path_preview(self, start: Signal, end: Signal) -> list[Edge]:
+    def get_path_preview(self, start: Signal, end: Signal) -> frozenset[Edge]:
+        """Edges connect_signals would lock, empty if there is no free route. Searched once per lock and block state."""
         while start.next_signal is not None:
             start = start.next_signal
-        poses = self.find_path(start.pose, end.pose)
-        if poses is None:
-            return [], False
-        edges = [Edge(poses[i].node, poses[i+1].node) for i in range(len(poses)-1)]
-        return edges
+        version = (self.lock_version, self._railway.graph.blocks_version)
+        if version != self._previews_version:
+            self._previews.clear()
+            self._previews_version = version
+        key = (start.pose, end.pose)
+        if key not in self._previews:
+            poses = self.find_path(start.pose, end.pose)
+            if poses is None:
+                self._previews[key] = frozenset()
+            else:
+                self._previews[key] = frozenset(Edge(poses[i].node, poses[i+1].node) for i in range(len(poses)-1))
+        return self._previews[key]
             
     def connect_signals(self, from_signal: Signal, to_signal: Signal) -> bool:
         while from_signal.next_signal is not None:
@@ -164,6 +236,7 @@ class SignallingService:
             
             
     def find_path(self, start: Pose, end: Pose, ignore_locks: bool = False) -> list[Pose] | None:
+        """A* over the legs of the routing graph, the poses of the cheapest unblocked route from start to end."""
         def is_node_blocked(node: Node) -> bool:
             if self._railway.graph.get_node_attr(node, "blocked"):
                 return True
@@ -176,7 +249,7 @@ class SignallingService:
             return None
         
         priority_queue: list[tuple[float, Pose]] = []
-        came_from: dict[Pose, Pose] = {}
+        came_from: dict[Pose, tuple[Pose, RouteLeg, int]] = {}  # pose -> vertex, leg and index of the pose in the leg
         g_score: dict[Pose, float] = {}
 
         g_score[start] = 0
@@ -185,28 +258,26 @@ class SignallingService:
 
         while priority_queue:
             _, current_pose = heapq.heappop(priority_queue)
-            for neighbor_pose in self._railway.graph_service.get_turn_neighbors(current_pose):
-                if neighbor_pose == end:
-                    came_from[neighbor_pose] = current_pose
-                    path = [neighbor_pose, current_pose]
-
-                    while current_pose in came_from:
-                        current_pose = came_from[current_pose]
-                        path.append(current_pose)
-
-                    return tuple(reversed(path))
-                          
-                if is_node_blocked(neighbor_pose.node):
-                    continue
-                
-                cost = 1.0 if current_pose.direction == neighbor_pose.direction else 1.01 # slight penalty for turning
-                tentative_g_score = g_score[current_pose] + cost
-
-                if neighbor_pose not in g_score or tentative_g_score < g_score[neighbor_pose]:
-                    came_from[neighbor_pose] = current_pose
-                    g_score[neighbor_pose] = tentative_g_score
-                    f_score = tentative_g_score + neighbor_pose.node.heuristic_to(end.node)
+            if current_pose == end:
+                path = [end]
+                while current_pose in came_from:
+                    current_pose, leg, index = came_from[current_pose]
+                    path.extend(reversed(leg.poses[:index]))
+                    path.append(current_pose)
+                return tuple(reversed(path))
 
-                    heapq.heappush(priority_queue, (f_score, neighbor_pose))
+            for leg in self._routing.legs(current_pose):
+                for index, pose in enumerate(leg.poses):
+                    # the end may be locked, e.g. by the train waiting at it
+                    if pose != end and is_node_blocked(pose.node):
+                        break
+                    if pose == end or index == len(leg.poses) - 1:
+                        tentative_g_score = g_score[current_pose] + leg.costs[index]
+                        if pose not in g_score or tentative_g_score < g_score[pose]:
+                            came_from[pose] = (current_pose, leg, index)
+                            g_score[pose] = tentative_g_score
+                            f_score = tentative_g_score + pose.node.heuristic_to(end.node)
+                            heapq.heappush(priority_queue, (f_score, pose))
+                        break
 
-        return None
\ No newline at end of file
+        return None
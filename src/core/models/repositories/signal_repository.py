@@ -37,6 +37,13 @@ class SignalRepository:
     def reset_all(self) -> None:
         for signal in self.all():
             signal.reset()
+            
+    def snapshot(self) -> tuple[tuple[Signal, tuple], ...]:
+        return tuple((signal, signal.snapshot()) for signal in self.all())
+    
+    def restore(self, snapshot: tuple[tuple[Signal, tuple], ...]) -> None:
+        for signal, state in snapshot:
+            signal.restore(state)
         
     def to_dict(self):
         return [signal.pose.to_dict() for signal in self.all()]
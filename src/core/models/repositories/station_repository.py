@@ -4,6 +4,7 @@ from core.models.geometry.position import Position
 
 from core.models.station import Station
 from core.models.railway.graph_adapter import GraphAdapter
+from core.models.railway.railway_change import ChangeKind, RailwayChange
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from core.models.railway.railway_system import RailwaySystem
@@ -21,18 +22,19 @@ class StationRepository:
         station = Station(name, node, self._next_id)
         self._stations[station.id] = station
         self._next_id += 1
-        self._railway.mark_modified()
+        self._railway.mark_modified(RailwayChange(ChangeKind.STATION_CHANGED, (node,)))
         return station
     
     def _remove(self, station_id: int) -> Station:
         station = self._stations.pop(station_id)
-        self._railway.mark_modified()
+        self._railway.mark_modified(RailwayChange(ChangeKind.STATION_CHANGED, (station.node,)))
         return station
     
     def move(self, station_id: int, new_node: Node) -> None:
         station = self._stations[station_id]
+        old_node = station.node
         station.node = new_node
-        self._railway.mark_modified()
+        self._railway.mark_modified(RailwayChange(ChangeKind.STATION_CHANGED, (old_node, new_node)))
     
     def get(self, station_id: int) -> Station:
         return self._stations[station_id]
@@ -57,18 +59,20 @@ class StationRepository:
     
     def add_platform(self, station_id: int, edges: frozenset[Edge]) -> None:
         platform = [edge.sorted() for edge in sorted(edges)]
-        self._railway.graph.set_edge_attr(platform[0], 'station', station_id)
-        for edge in platform[1:]:
-            self._railway.graph.set_edge_attr(edge, 'station', station_id)
-            self._railway.graph.set_node_attr(edge.a, 'station', station_id)
+        with self._railway.batch():
+            self._railway.graph.set_edge_attr(platform[0], 'station', station_id)
+            for edge in platform[1:]:
+                self._railway.graph.set_edge_attr(edge, 'station', station_id)
+                self._railway.graph.set_node_attr(edge.a, 'station', station_id)
         
         self._stations[station_id].platforms.add(edges)
     
     def _remove_platform(self, edges: frozenset[Edge]) -> None:
-        for edge in edges:
-            self._railway.graph.remove_edge_attr(edge, 'station')
-            self._railway.graph.remove_node_attr(edge.a, 'station')
-            self._railway.graph.remove_node_attr(edge.b, 'station')
+        with self._railway.batch():
+            for edge in edges:
+                self._railway.graph.remove_edge_attr(edge, 'station')
+                self._railway.graph.remove_node_attr(edge.a, 'station')
+                self._railway.graph.remove_node_attr(edge.b, 'station')
             
     def is_node_platform(self, node: Node) -> bool:
         if not self._railway.graph.has_node(node):
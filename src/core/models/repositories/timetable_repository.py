@@ -1,4 +1,5 @@
 from core.models.timetable import Timetable
+from core.models.railway.railway_change import ChangeKind, RailwayChange
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from core.models.railway.railway_system import RailwaySystem
@@ -10,11 +11,11 @@ class TimetableRepository:
 
     def add(self, timetable: Timetable) -> None:
         self._timetables.append(timetable)
-        self._railway.mark_modified()
+        self._railway.mark_modified(RailwayChange(ChangeKind.TIMETABLE_CHANGED))
 
     def remove(self, timetable: Timetable) -> None:
         self._timetables.remove(timetable)
-        self._railway.mark_modified()
+        self._railway.mark_modified(RailwayChange(ChangeKind.TIMETABLE_CHANGED))
         
     def all(self) -> list[Timetable]:
         return self._timetables
@@ -22,10 +23,21 @@ class TimetableRepository:
     def get(self, index: int) -> Timetable:
         return self._timetables[index]
     
+    def get_by_code(self, code: str) -> Timetable | None:
+        return next((timetable for timetable in self._timetables if timetable.code == code), None)
+    
     def remove_station_from_all(self, station_id):
         for timetable in self._timetables:
             timetable.remove_station_from_stops(station_id)
             
+    def snapshot(self) -> tuple[tuple[Timetable, tuple[int, ...]], ...]:
+        """Start times still free, creating and returning schedules changes them."""
+        return tuple((timetable, tuple(timetable.start_times)) for timetable in self._timetables)
+    
+    def restore(self, snapshot: tuple[tuple[Timetable, tuple[int, ...]], ...]) -> None:
+        for timetable, start_times in snapshot:
+            timetable.start_times[:] = start_times
+            
     def calculate_start_times(self) -> None:
         for timetable in self._timetables:
             timetable.calculate_start_times()
@@ -1,6 +1,7 @@
 from core.models.geometry.edge import Edge
-from core.models.train import Train, TrainConfig
+from core.models.train import Train, TrainConfig, TrainSnapshot
 from core.config.config import Config
+from core.models.railway.railway_change import ChangeKind, RailwayChange
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -12,20 +13,40 @@ class TrainRepository:
         self._railway = railway
         self._next_id = 0
         self._saved_states: dict[int, dict] | None = None
+        self._occupancy: dict[Edge, int] = {}
 
     def _generate_id(self) -> int:
         self._next_id += 1
         return self._next_id
 
     def remove(self, train_id: int) -> None:
-        del self._trains[train_id]
-        self._railway.mark_modified()
+        train = self._trains.pop(train_id)
+        self._unindex(train)
+        self._railway.mark_modified(self._train_change(train))
         
     def get_train_on_edge(self, edge: Edge) -> int | None:
-        for train_id, train in self._trains.items():
-            if train.occupies_edge(edge):
-                return train_id
-        return None
+        return self._occupancy.get(edge)
+    
+    def occupy(self, edge: Edge, train_id: int) -> None:
+        """Called by a train when its head enters an edge."""
+        self._occupancy[edge] = train_id
+        
+    def vacate(self, edge: Edge, train_id: int) -> None:
+        """Called by a train when its tail leaves an edge."""
+        if self._occupancy.get(edge) == train_id:
+            del self._occupancy[edge]
+            
+    def _index(self, train: Train) -> None:
+        for rail in train.get_occupied_rails():
+            self._occupancy[rail.edge] = train.id
+            
+    def _unindex(self, train: Train) -> None:
+        for rail in train.get_occupied_rails():
+            self.vacate(rail.edge, train.id)
+            
+    def _train_change(self, train: Train) -> RailwayChange:
+        nodes = {node for rail in train.get_occupied_rails() for node in (rail.edge.a, rail.edge.b)}
+        return RailwayChange(ChangeKind.TRAIN_CHANGED, tuple(nodes))
 
     def all(self) -> list[Train]:
         return list(self._trains.values())
@@ -37,7 +58,8 @@ class TrainRepository:
         id = self._generate_id()
         train.id = id
         self._trains[id] = train
-        self._railway.mark_modified()
+        self._index(train)
+        self._railway.mark_modified(self._train_change(train))
         return id
     
     def create_train(self, edges: frozenset[Edge], config: TrainConfig) -> Train:
@@ -57,10 +79,22 @@ class TrainRepository:
         for train_data in data['trains']:
             train = Train.from_dict(train_data, railway)
             instance._trains[train.id] = train
+            instance._index(train)
             
         instance._next_id = data["next_id"]
         return instance
     
+    def snapshot(self) -> tuple[dict[int, TrainSnapshot], dict[Edge, int]]:
+        return {train_id: train.snapshot() for train_id, train in self._trains.items()}, dict(self._occupancy)
+    
+    def restore(self, snapshot: tuple[dict[int, TrainSnapshot], dict[Edge, int]]) -> None:
+        trains, occupancy = snapshot
+        if trains.keys() != self._trains.keys():
+            raise ValueError("Trains were added or removed after the snapshot was taken.")
+        for train_id, state in trains.items():
+            self._trains[train_id].restore(state)
+        self._occupancy = dict(occupancy)
+        
     def save_state(self) -> None:
         """Save the current state of all trains to memory."""
         self._saved_states = {}
@@ -75,7 +109,9 @@ class TrainRepository:
         if self._saved_states is None:
             return
         self._trains.clear()
+        self._occupancy.clear()
         for train_id, state in self._saved_states.items():
             train = Train(state['edges'], self._railway, state['config'])
             train.id = train_id
-            self._trains[train_id] = train
\ No newline at end of file
+            self._trains[train_id] = train
+            self._index(train)
\ No newline at end of file
@@ -59,6 +59,13 @@ class Signal:
         self._release_subscriber = None
         self._passed_subscriber = None
         self._drop_subscriber = None
+        
+    def snapshot(self) -> tuple:
+        # path lists are replaced, never changed in place, so they can be shared
+        return self.next_signal, self.path, self._release_subscriber, self._drop_subscriber, self._passed_subscriber
+    
+    def restore(self, snapshot: tuple) -> None:
+        self.next_signal, self.path, self._release_subscriber, self._drop_subscriber, self._passed_subscriber = snapshot
             
     @property
     def direction(self) -> Direction:
@@ -1,7 +1,22 @@
 from math import floor
 
+# a tick at any rate dividing this (e.g. 20, 30 or 60 per second) is a whole number of units
+_UNITS_PER_SECOND = 720720
+_UNITS_PER_DAY = 24 * 3600 * _UNITS_PER_SECOND
+
 class Time:
-    current_time: float = None
+    """Seconds since midnight, counted in whole units so steps add up exactly instead of drifting below the full second."""
+    _units: int | None = None
+    _seconds: float | None = None
+    
+    @property
+    def current_time(self) -> float | None:
+        return self._seconds
+    
+    @current_time.setter
+    def current_time(self, seconds: float | None) -> None:
+        self._units = None if seconds is None else round(seconds * _UNITS_PER_SECOND) % _UNITS_PER_DAY
+        self._seconds = None if seconds is None else self._units / _UNITS_PER_SECOND
         
     def get_hms(self) -> tuple[str, str, str]:
         if self.current_time is None:
@@ -12,8 +27,8 @@ class Time:
         return hours, minutes, seconds
     
     def add(self, seconds: float) -> None:
-        self.current_time += seconds
-        self.current_time %= 24 * 3600  # wrap around after 24 hours
+        self._units = (self._units + round(seconds * _UNITS_PER_SECOND)) % _UNITS_PER_DAY  # wrap around after 24 hours
+        self._seconds = self._units / _UNITS_PER_SECOND
         
     def set_time_from_string(self, time_str: str) -> bool:
         try:
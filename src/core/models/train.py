@@ -6,45 +6,73 @@ from core.models.signal import Signal
 from core.models.schedule import Schedule
 from core.models.train_config import TrainConfig
 
-from typing import TYPE_CHECKING, Callable
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass
+from math import inf
+from typing import TYPE_CHECKING, Callable, Iterable
 if TYPE_CHECKING:
     from core.models.railway.railway_system import RailwaySystem
     
-DT = 1 / Config.FPS
+DT = 1 / Config.SIMULATION_TICK_RATE
+
+@dataclass(frozen=True, slots=True)
+class TrainSnapshot:
+    """Everything Train.tick reads or writes, from the rear rail on."""
+    rails: tuple[Rail, ...]
+    ends: tuple[float, ...]
+    position: float
+    speed: float
+    live: bool
+    schedule: Schedule | None
+    schedule_index: int
+    stop_time_counter: float
+    routed_to_station_ahead: bool
+    speed_profile: tuple[float, ...]
+    release_unsubscribe: Callable | None
 
 class Train:
     id: int = None
-    path : list[Rail] = None
     _railway: 'RailwaySystem'
     config: TrainConfig
     speed : float = 0.0
     schedule : Schedule = None
     live: bool = False
-    _path_distance : float = 0.0
-    _occupied_edge_count_cache : int | None = None
+    # the path is _rails[_tail:], rails before the tail were passed and are dropped in bulk
+    _rails: list[Rail] = None
+    _ends: list[float] = None  # _ends[i] is the path distance to the start of _rails[i], one entry more than _rails
+    _tail: int = 0
+    _position: float = 0.0  # path distance to the rear of the train
+    _head_cache : int | None = None
     _release_unsubscribe: Callable | None = None
-    _speed_profile: list[float] = None
+    _speed_profile: list[float] = None  # speed at the end of each rail from the head edge on, in path order
+    _profile_head: int = 0  # index of the head edge in _speed_profile, entries before it are consumed
+    _line_speed_window: deque[tuple[int, int]] | None = None  # (index in _rails, speed) with increasing speeds
     _routed_to_station_ahead: bool = False
     _stop_time_counter: float = 0.0
+    _revision: int = 0  # bumped whenever the path, speed profile or schedule changes outside tick
+    _coast_distance: float = 0.0
+    _coast_stop_time: float = 0.0
+    _idle_revision: int = -1  # _revision at which the train was last found idle, RailwaySystem.tick skips it until then
      
     def __init__(self, edges: list[Edge], railway: 'RailwaySystem', config: TrainConfig) -> None:
         self._railway = railway
         self.config = config.copy()
         self._speed_profile = []
-        self.path = [self._railway.graph.get_rail(edge) for edge in edges]
+        self._set_path([self._railway.graph.get_rail(edge) for edge in edges])
         self._path_distance = self.get_distance_until_next_edge() - Config.TRAIN_SAFETY_BUFFER
         
         if self._path_distance < 0.0:
-            self._path_distance += self.path[0].length
+            self._path_distance += self._rails[self._tail].length
         
     def tick(self):
         if not self.live:
             return
         
         distance_until_next_edge = self.get_distance_until_next_edge()
-        speed_due_to_braking = self.get_max_speed(distance_until_next_edge, self._speed_profile[-1])
+        speed_due_to_braking = self.get_max_speed(distance_until_next_edge, self._speed_ahead)
         speed_with_acc = self.speed + (self.config.acceleration * DT)
-        speed_due_to_tracks = min(rail.speed for rail in self.path[:self._occupied_edge_count])
+        speed_due_to_tracks = self._line_speed
         self.speed = min(speed_due_to_braking, speed_with_acc, speed_due_to_tracks)
             
         if self.speed == 0.0:
@@ -56,7 +84,7 @@ class Train:
                     self.shutdown()
                     self.schedule = None
                 if dep_time is not None and dep_time <= self._railway.time.in_minutes() and self._stop_time_counter >= Config.MIN_TRAIN_STOP_TIME:
-                    if len(self.path) == self._occupied_edge_count:
+                    if self._head == len(self._rails) - 1:
                         #no more path ahead, stay stopped
                         return
                     self._routed_to_station_ahead = False
@@ -66,19 +94,91 @@ class Train:
             return
             
         travel_distance = (self.speed * DT - self.config.deceleration * DT * DT / 2)/3.6
+        head_before = self._head
         if distance_until_next_edge < travel_distance:
-            self._speed_profile.pop()
-            self._railway.signalling.reached(self.path[self._occupied_edge_count].edge)
+            self._profile_head += 1
+            self._railway.signalling.reached(self._rails[head_before + 1].edge)
             
-        self._occupied_edge_count_cache = None
-        self._path_distance += travel_distance
+        window = self._line_speeds()
+        self._position += travel_distance
+        self._head_cache = None
+        for index in range(head_before + 1, self._head + 1):
+            rail = self._rails[index]
+            self._railway.trains.occupy(rail.edge, self.id)
+            while window and window[-1][1] >= rail.speed:
+                window.pop()
+            window.append((index, rail.speed))
         
-        first_edge_length = self.path[0].length
-        if self._path_distance >= first_edge_length:
-            self._path_distance -= first_edge_length
-            passed_rail = self.path.pop(0)
+        if self._position >= self._ends[self._tail + 1]:
+            passed_rail = self._rails[self._tail]
+            if window[0][0] == self._tail:
+                window.popleft()
+            self._tail += 1
+            self._compact()
+            self._railway.trains.vacate(passed_rail.edge, self.id)
             self._railway.signalling.passed(passed_rail.edge)
             
+    def coast_ticks(self) -> int | float:
+        """Count the upcoming ticks that would only add a constant distance or dwell time.
+        
+        Those ticks may be applied with coast instead of tick, the tick after them must be a full one.
+        The count stays valid until the train's _revision changes.
+        """
+        self._coast_distance = 0.0
+        self._coast_stop_time = 0.0
+        if not self.live:
+            return inf
+        
+        distance_until_next_edge = self.get_distance_until_next_edge()
+        speed_ahead = self._speed_ahead
+        speed_due_to_braking = self.get_max_speed(distance_until_next_edge, speed_ahead)
+        speed_with_acc = self.speed + (self.config.acceleration * DT)
+        speed_due_to_tracks = self._line_speed
+        speed = min(speed_due_to_braking, speed_with_acc, speed_due_to_tracks)
+        
+        if speed != self.speed:
+            return 0 # accelerating, braking or coming to a stop
+        if speed == 0.0:
+            if not self._routed_to_station_ahead:
+                return inf # held at a signal until the path ahead changes
+            return self._dwell_ticks()
+        if speed != speed_due_to_tracks:
+            return 0 # held below the line speed by the braking curve
+        
+        travel_distance = (speed * DT - self.config.deceleration * DT * DT / 2)/3.6
+        if travel_distance <= 0.0:
+            return 0
+        braking_distance = 0.0 if speed <= speed_ahead else max(self.get_braking_distance(speed, speed_ahead), 0.1)
+        room = min(distance_until_next_edge - braking_distance, self._ends[self._tail + 1] - self._position)
+        ticks = int(room / travel_distance) - 2 # keep clear of the boundary, rounding may differ from tick
+        if ticks <= 0:
+            return 0
+        self._coast_distance = travel_distance
+        return ticks
+    
+    def _dwell_ticks(self) -> int | float:
+        dep_time = self.schedule.get_departure_time()
+        if dep_time is None:
+            return 0
+        self._coast_stop_time = DT
+        if self._head == len(self._rails) - 1:
+            return inf # cannot depart until the path is extended
+        ticks_until_stop_time = (Config.MIN_TRAIN_STOP_TIME - self._stop_time_counter) / DT
+        ticks_until_departure = (dep_time * 60 - self._railway.time.current_time) / DT
+        return max(int(max(ticks_until_stop_time, ticks_until_departure)) - 2, 0)
+    
+    def is_idle(self) -> bool:
+        """Tell whether ticking changes nothing until _revision changes: shut down or held at a signal."""
+        if not self.live:
+            return True
+        return self.speed == 0.0 and not self._routed_to_station_ahead and self.coast_ticks() == inf
+    
+    def coast(self, ticks: int) -> None:
+        """Apply ticks counted by coast_ticks at once, each of them adds the same distance or dwell time."""
+        if self._coast_distance:
+            self._position += self._coast_distance * ticks
+        elif self._coast_stop_time:
+            self._stop_time_counter += self._coast_stop_time * ticks
     
     def start(self) -> None:
         self.live = True
@@ -87,107 +187,263 @@ class Train:
         
     def set_initial_path(self) -> None:
         path, signal = self._railway.signalling.set_initial_path(self.get_locomotive_pose())
-        self.path += [self._railway.graph.get_rail(edge) for edge in path]
+        self._append_rails(self._railway.graph.get_rail(edge) for edge in path)
         if signal is None:
             return
         self.extend_path(signal)
         
     def signal_released(self, signal: Signal) -> bool:
         self._release_unsubscribe()
+        path_length = len(self._rails)
         self.extend_path(signal)
-        self.compute_speed_profile()
+        self._extend_speed_profile(len(self._rails) - path_length)
         
     def extend_path(self, signal: Signal) -> None:
+        self._revision += 1
         while signal.next_signal is not None:
-            self.path += [self._railway.graph.get_rail(edge) for edge in signal.path]
+            self._append_rails(self._railway.graph.get_rail(edge) for edge in signal.path)
             signal.subscribe_drop(self.signal_dropped)
             signal = signal.next_signal
         self._release_unsubscribe = signal.subscribe_release(self.signal_released)
     
     def signal_dropped(self) -> None:
+        self._revision += 1
         self._release_unsubscribe()
-        self._railway.signalling.release_path([rail.edge for rail in self.path[self._occupied_edge_count:]])
-        self.path = self.path[:self._occupied_edge_count]
+        self._truncate_path()
         self._routed_to_station_ahead = False
         self.set_initial_path()
         self.compute_speed_profile()
         
     def reverse(self) -> None:
-        self._path_distance = self.get_distance_until_next_edge()
-        self.path = [rail.reversed() for rail in reversed(self.path)]
+        self._revision += 1
+        self._line_speed_window = None
+        path_distance = self.get_distance_until_next_edge()
+        self._set_path([rail.reversed() for rail in reversed(self.path)])
+        self._path_distance = path_distance
             
     def shutdown(self) -> None:
+        self._revision += 1
         self.live = False
-        self._railway.signalling.release_path([rail.edge for rail in self.path[self._occupied_edge_count:]])
-        self.path = self.path[:self._occupied_edge_count]
+        self._truncate_path()
         self._routed_to_station_ahead = False
         if self._release_unsubscribe is not None:
             self._release_unsubscribe()
         
         
     def compute_speed_profile(self):
+        self._revision += 1
         if self._routed_to_station_ahead:
             return
         self._speed_profile = []
+        self._profile_head = 0
         speed = 0.0
-        for rail in reversed(self.path[self._occupied_edge_count - 1:]):
-            if not self._routed_to_station_ahead and self._railway.stations.is_edge_platform(rail.edge):
-                station_id = self._railway.stations.get_edge_station(rail.edge)
-                if self.schedule and station_id == self.schedule.get_next_station().id:
-                    self._routed_to_station_ahead = True
-                    speed = 0.0
+        for rail in reversed(self._rails[self._head:]):
+            speed = self._profile_entry(rail, speed)
             #add the speed at the end of this rail
             self._speed_profile.append(speed)
             speed = min(rail.speed, self.get_max_speed(rail.length, speed))
+        self._speed_profile.reverse()
+        
+    def _profile_entry(self, rail: Rail, speed: float) -> float:
+        """Speed at the end of rail given the speed at the start of the next one, stops at the next station."""
+        if not self._routed_to_station_ahead and self._railway.stations.is_edge_platform(rail.edge):
+            station_id = self._railway.stations.get_edge_station(rail.edge)
+            if self.schedule and station_id == self.schedule.get_next_station().id:
+                self._routed_to_station_ahead = True
+                return 0.0
+        return speed
+        
+    def _extend_speed_profile(self, new_rail_count: int) -> None:
+        """Update the profile after rails were appended to the path, recomputing backwards only until it converges."""
+        if self._routed_to_station_ahead:
+            return
+        self._revision += 1
+        profile = self._speed_profile
+        if len(profile) - self._profile_head + new_rail_count != len(self._rails) - self._head:
+            self.compute_speed_profile() # out of step with the path, start over
+            return
+        if self._profile_head > 32 and self._profile_head * 2 > len(profile):
+            del profile[:self._profile_head]
+            self._profile_head = 0
+        
+        old_length = len(profile)
+        new_rails = self._rails[len(self._rails) - new_rail_count:]
+        tail: list[float] = []
+        speed = 0.0
+        for rail in reversed(new_rails):
+            speed = self._profile_entry(rail, speed)
+            tail.append(speed)
+            speed = min(rail.speed, self.get_max_speed(rail.length, speed))
+        tail.reverse()
+        profile += tail
+        
+        # the rails already covered have no platform of the next station, or the train would be routed there
+        path_offset = len(self._rails) - len(profile)
+        for index in range(old_length - 1, self._profile_head - 1, -1):
+            old = profile[index]
+            if speed == old and type(speed) is type(old):
+                break # everything before depends only on this value
+            profile[index] = speed
+            rail = self._rails[index + path_offset]
+            speed = min(rail.speed, self.get_max_speed(rail.length, speed))
         
     def get_max_speed(self, distance: float, speed: float) -> float:
         if distance <= 0.1:
             return speed
             # FORMULA: V = sqrt(u^2 + 2as)
         return (((speed/3.6)**2 + (2 * distance * (self.config.deceleration/3.6))) ** 0.5) * 3.6
+    
+    def get_braking_distance(self, speed: float, target_speed: float) -> float:
+        """Distance needed to brake from speed to target_speed, the inverse of get_max_speed."""
+        return ((speed/3.6)**2 - (target_speed/3.6)**2) / (2 * (self.config.deceleration/3.6))
                 
     def get_locomotive_pose(self) -> Pose:
-        return Pose.from_edge(self.path[self._occupied_edge_count - 1].edge)
+        return Pose.from_edge(self._rails[self._head].edge)
     
             
     def set_schedule(self, schedule: Schedule) -> None:
+        self._revision += 1
         if self.schedule is not None:
             self._railway.routes.return_start_time(self.schedule.timetable_code, schedule.stops[0]['departure_time'])
         self.schedule = schedule
         
     def remove_schedule(self) -> None:
+        self._revision += 1
         if self.schedule is not None:
             self._railway.timetables.return_start_time(self.schedule.timetable_code, self.schedule.stops[0]['departure_time'])
         self.schedule = None
     
     @property
-    def _occupied_edge_count(self) -> int:
-        if self._occupied_edge_count_cache is not None:
-            return self._occupied_edge_count_cache
+    def path(self) -> list[Rail]:
+        """Rails from the one under the rear of the train to the end of the granted route."""
+        return self._rails[self._tail:]
+    
+    def _set_path(self, rails: list[Rail]) -> None:
+        self._rails = []
+        self._ends = [0.0]
+        self._tail = 0
+        self._position = 0.0
+        self._head_cache = None
+        self._append_rails(rails)
+    
+    def _append_rails(self, rails: Iterable[Rail]) -> None:
+        end = self._ends[-1]
+        for rail in rails:
+            end += rail.length
+            self._rails.append(rail)
+            self._ends.append(end)
+    
+    def _truncate_path(self) -> None:
+        """Release and drop the rails ahead of the head edge."""
+        head = self._head
+        self._railway.signalling.release_path([rail.edge for rail in self._rails[head + 1:]])
+        del self._rails[head + 1:]
+        del self._ends[head + 2:]
+    
+    def _compact(self) -> None:
+        """Drop passed rails once they make up most of the list, distances stay as they are."""
+        tail = self._tail
+        if tail <= 32 or tail * 2 <= len(self._rails):
+            return
+        del self._rails[:tail]
+        del self._ends[:tail]
+        self._tail = 0
+        if self._head_cache is not None:
+            self._head_cache -= tail
+        if self._line_speed_window is not None:
+            self._line_speed_window = deque((index - tail, speed) for index, speed in self._line_speed_window)
+    
+    @property
+    def _path_distance(self) -> float:
+        """Distance from the start of the rear rail to the rear of the train."""
+        return self._position - self._ends[self._tail]
+    
+    @_path_distance.setter
+    def _path_distance(self, distance: float) -> None:
+        self._position = self._ends[self._tail] + distance
+        self._head_cache = None
+    
+    @property
+    def _head(self) -> int:
+        """Index in _rails of the rail under the front of the train."""
+        if self._head_cache is None:
+            # the last rail starting before the front
+            head_position = self._position + self.config.total_length
+            self._head_cache = bisect_left(self._ends, head_position, self._tail + 1) - 1
+        return self._head_cache
         
-        remaining = self.config.total_length + self._path_distance
-        count = 0
-        while remaining > 0:
-            remaining -= self.path[count].length
-            count += 1
+    @property
+    def _speed_ahead(self) -> float:
+        """Speed the train must be down to at the end of the head edge."""
+        return self._speed_profile[self._profile_head]
+    
+    def _line_speeds(self) -> deque[tuple[int, int]]:
+        """Sliding window minimum of rail speeds under the train, rebuilt if unknown."""
+        if self._line_speed_window is None:
+            self._line_speed_window = deque()
+            for index in range(self._tail, self._head + 1):
+                rail = self._rails[index]
+                while self._line_speed_window and self._line_speed_window[-1][1] >= rail.speed:
+                    self._line_speed_window.pop()
+                self._line_speed_window.append((index, rail.speed))
+        return self._line_speed_window
+    
+    @property
+    def _line_speed(self) -> int:
+        """Lowest rail speed under the train."""
+        return self._line_speeds()[0][1]
         
-        self._occupied_edge_count_cache = count
-        return count
+    @property
+    def stops_at_next_station(self) -> bool:
+        """Whether the granted route reaches a platform of the next station, where the train will stop."""
+        return self._routed_to_station_ahead
         
-    def get_occupied_rails(self) -> tuple[Rail, ...]:
-        return self.path[:self._occupied_edge_count]
+    def get_occupied_rails(self) -> list[Rail]:
+        return self._rails[self._tail:self._head + 1]
     
     def occupies_edge(self, edge: Edge) -> bool:
-        return edge in tuple(rail.edge for rail in self.path[:self._occupied_edge_count])
+        return edge in tuple(rail.edge for rail in self.get_occupied_rails())
         
     def get_distance_until_next_edge(self) -> float:
-        remaining = self.config.total_length + self._path_distance
-        i = 0
-        while remaining - self.path[i].length > 0:
-            remaining -= self.path[i].length
-            i += 1
-        return self.path[i].length - remaining
+        return self._ends[self._head + 1] - (self._position + self.config.total_length)
+    
+    def snapshot(self) -> TrainSnapshot:
+        return TrainSnapshot(
+            rails=tuple(self._rails[self._tail:]),
+            ends=tuple(self._ends[self._tail:]),
+            position=self._position,
+            speed=self.speed,
+            live=self.live,
+            schedule=self.schedule,
+            schedule_index=self.schedule.index if self.schedule is not None else 0,
+            stop_time_counter=self._stop_time_counter,
+            routed_to_station_ahead=self._routed_to_station_ahead,
+            speed_profile=tuple(self._speed_profile[self._profile_head:]),
+            release_unsubscribe=self._release_unsubscribe,
+        )
     
+    def restore(self, snapshot: TrainSnapshot) -> None:
+        """Return to a snapshot of this train, the signals it subscribed to are restored with theirs."""
+        self._rails = list(snapshot.rails)
+        self._ends = list(snapshot.ends)
+        self._tail = 0
+        self._position = snapshot.position
+        self._head_cache = None
+        self.speed = snapshot.speed
+        self.live = snapshot.live
+        self.schedule = snapshot.schedule
+        if self.schedule is not None:
+            self.schedule.index = snapshot.schedule_index
+        self._stop_time_counter = snapshot.stop_time_counter
+        self._routed_to_station_ahead = snapshot.routed_to_station_ahead
+        self._speed_profile = list(snapshot.speed_profile)
+        self._profile_head = 0
+        self._line_speed_window = None
+        self._release_unsubscribe = snapshot.release_unsubscribe
+        self._coast_distance = 0.0
+        self._coast_stop_time = 0.0
+        self._revision += 1
+        
     def is_late(self) -> bool:
         if not self.schedule:
             return False
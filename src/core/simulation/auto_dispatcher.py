@@ -0,0 +1,254 @@
+from collections import Counter, deque
+
+from core.config.config import Config
+from core.models.geometry.direction import Direction
+from core.models.geometry.edge import Edge
+from core.models.geometry.pose import Pose
+from core.models.railway.railway_change import ChangeKind, RailwayChange
+from core.models.schedule import Schedule
+from core.models.signal import Signal
+from core.models.station import Station
+from core.models.train import Train
+from core.simulation.command_executor import CommandExecutor
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from core.models.railway.railway_system import RailwaySystem
+
+# a train that could not be routed is tried again after this many ticks at the soonest, path searches are not free
+_RETRY_TICKS = 10 * Config.SIMULATION_TICK_RATE
+# minutes before its departure a train standing at a platform gets the route onwards
+_DEPARTURE_LEAD = 1
+# nodes searched past the end of a platform for the signal that closes it
+_EXIT_SEARCH_DEPTH = 32
+
+
+class AutoDispatcher:
+    """Sets routes for scheduled trains the way a dispatcher clicking signals would.
+
+    Every Config.AUTO_DISPATCH_INTERVAL ticks, each live scheduled train whose route ends at
+    a signal gets a route from there to the first signal past a free platform of its next
+    station. A train standing at a platform is routed onwards shortly before it departs. A
+    train that finished its service is reversed and given the next free service starting
+    at its terminus. Everything goes through the command executor, so the dispatcher's
+    decisions are recorded like a human's and a replay repeats them without it.
+
+    At a station with several platforms, trains heading the same way may hold all but one
+    of them, so trains meeting there from both ends cannot lock each other out. There is no
+    look-ahead beyond that, trains meeting head-on on single track can still block each other.
+    """
+    def __init__(self, railway: 'RailwaySystem', executor: CommandExecutor):
+        self._railway = railway
+        self._executor = executor
+        self._exits: dict[int, list[tuple[Signal, Direction]]] = {}  # station id -> exit signals and the way they lead out
+        self._reachable: dict[tuple[Pose, int], list[tuple[Signal, Direction]]] = {}  # (signal pose, station id) -> exits routes lead to
+        self._routed: dict[int, tuple[Schedule, int]] = {}  # train id -> schedule and index of the stop last routed to
+        self._retry: dict[int, tuple[int, int]] = {}  # train id -> earliest tick and lock releases to wait for after a failure
+        self._in_service: set[int] = set()  # ids of the trains that had a schedule at the last pass
+        self._turning: set[int] = set()  # ids of the trains that finished a service and wait for the next one
+        self._reversed: set[int] = set()  # ids of the trains turned for facing away, not turned again until routed
+        self._unsubscribe = railway.subscribe_to_modifications(self._on_railway_modified)
+
+    def close(self) -> None:
+        """Stop following the railway's changes, call it when the dispatcher is discarded."""
+        self._unsubscribe()
+
+    def _on_railway_modified(self, change: RailwayChange) -> None:
+        if change.kind is ChangeKind.RESTORED:
+            self._restored()
+            return
+        if change.kind not in (ChangeKind.TIMETABLE_CHANGED, ChangeKind.TRAIN_CHANGED):
+            self._exits.clear()
+            self._reachable.clear()
+            self._retry.clear()
+
+    def _restored(self) -> None:
+        """Rebuild what the trains were routed to from the restored routes, decisions taken after the snapshot are gone."""
+        trains = self._railway.trains.all()
+        self._routed.clear()
+        self._retry.clear()
+        self._reversed.clear()
+        for train in trains:
+            if train.schedule is not None and train.live:
+                index = self._routed_index(train)
+                if index is not None:
+                    self._routed[train.id] = (train.schedule, index)
+        self._in_service = {train.id for train in trains if train.schedule is not None}
+        self._turning = {train.id for train in trains if train.schedule is None and train.id in self._turning}
+
+    def _routed_index(self, train: Train) -> int | None:
+        """Index of the stop whose exit signal the train's route ends at, the next stop or the one ahead of it."""
+        end = Pose.from_edge(train.path[-1].edge)
+        schedule = train.schedule
+        for index in (schedule.index + 1, schedule.index):
+            if index < len(schedule.stops) and any(exit.pose == end for exit, _ in self._exit_signals(schedule.stops[index]['station'])):
+                return index
+        return None
+
+    def advance(self, ticks: int) -> None:
+        """Advance the executor, dispatching every Config.AUTO_DISPATCH_INTERVAL ticks of the simulation."""
+        interval = Config.AUTO_DISPATCH_INTERVAL
+        end = self._executor.tick + ticks
+        while self._executor.tick < end:
+            until_pass = interval - self._executor.tick % interval
+            step = min(until_pass, end - self._executor.tick)
+            self._executor.advance(step)
+            if step == until_pass:
+                self.dispatch()
+
+    def dispatch(self) -> None:
+        """Route and turn around every train that needs it right now."""
+        for train in self._railway.trains.all():
+            if train.schedule is not None:
+                self._in_service.add(train.id)
+                if train.live:
+                    self._route(train)
+                continue
+            if train.id in self._in_service:
+                self._in_service.discard(train.id)
+                self._turning.add(train.id)
+            if train.id in self._turning and not train.live:
+                self._turn_around(train)
+
+    def _route(self, train: Train) -> None:
+        schedule = train.schedule
+        index = schedule.index
+        if train.stops_at_next_station:
+            departure_time = schedule.get_departure_time()
+            if (departure_time is None or train.speed != 0.0
+                    or departure_time - _DEPARTURE_LEAD > self._railway.time.in_minutes()):
+                return # not standing at the platform yet, or not about to leave
+            index += 1
+        if self._routed.get(train.id) == (schedule, index):
+            return # routed there already, waiting to depart
+        if train.id in self._retry:
+            tick, releases = self._retry[train.id]
+            if tick > self._executor.tick or releases == self._railway.signalling.releases:
+                return # nothing was freed since the last attempt
+
+        station = schedule.stops[index]['station']
+        signal = self._route_end(train)
+        through = index < len(schedule.stops) - 1
+        if signal is not None and self._connect_to_station(signal, station, through):
+            self._routed[train.id] = (schedule, index)
+            self._retry.pop(train.id, None)
+            self._reversed.discard(train.id)
+            return
+        self._retry[train.id] = (self._executor.tick + _RETRY_TICKS, self._railway.signalling.releases)
+        if train.speed == 0.0 and train.id not in self._reversed and self._faces_away(train, signal, station):
+            # e.g. placed the wrong way round in a siding, turn it once like a dispatcher would
+            self._reversed.add(train.id)
+            self._retry.pop(train.id)
+            self._executor.shutdown_train(train)
+            self._executor.reverse_train(train)
+            self._executor.start_train(train)
+
+    def _route_end(self, train: Train) -> Signal | None:
+        """The signal the train's granted route ends at, if it has not been cleared yet."""
+        pose = Pose.from_edge(train.path[-1].edge)
+        if not self._railway.signals.has_with_pose(pose):
+            return None
+        signal = self._railway.signals.get(pose.node)
+        return signal if signal.next_signal is None else None
+
+    def _faces_away(self, train: Train, signal: Signal | None, station: Station) -> bool:
+        """Whether the station cannot be reached ahead of the train even once other routes are released."""
+        if signal is None:
+            # a route ending elsewhere stops at a dead end or at an edge locked by another route
+            return not self._railway.graph_service.get_turn_neighbors(Pose.from_edge(train.path[-1].edge))
+        return not self._reachable_exits(signal, station)
+
+    def _connect_to_station(self, signal: Signal, station: Station, through: bool) -> bool:
+        """Route from the signal through a free platform of the station, the closest exit first.
+
+        Trains passing through keep to the platforms on their own side of the way towards the
+        closest exit, like on double track, so trains going opposite ways do not meet head-on.
+        """
+        exits = self._reachable_exits(signal, station)
+        if not exits:
+            return False
+        if through:
+            way = exits[0][1]
+            side = sorted((exit for exit in exits if exit[1] == way),
+                          key=lambda exit: exit[0].node.x * way.y - exit[0].node.y * way.x)
+            exits = side[:max(1, len(side) // 2)]
+        # a train holds a platform from being routed into it until it is routed on
+        ways = {exit.pose: direction for exit, direction in self._exit_signals(station)}
+        held = Counter(ways.get(Pose.from_edge(train.path[-1].edge)) for train in self._railway.trains.all() if train.live)
+        for exit, direction in exits:
+            if len(station.platforms) > 1 and held[direction] >= len(station.platforms) - 1:
+                continue # leave a platform for the trains coming the other way
+            poses = self._railway.signalling.find_path(signal.pose, exit.pose)
+            if poses is None:
+                continue
+            # the closest way to an exit may run past the station, e.g. on a through track
+            if not any(self._railway.stations.get_edge_station(Edge(a.node, b.node)) == station.id
+                       for a, b in zip(poses, poses[1:])):
+                continue
+            if self._executor.connect_signals(signal, exit):
+                return True
+        return False
+
+    def _reachable_exits(self, signal: Signal, station: Station) -> list[tuple[Signal, Direction]]:
+        """Exit signals of the station that some route from the signal leads to, the closest first."""
+        key = (signal.pose, station.id)
+        if key not in self._reachable:
+            exits = [exit for exit in self._exit_signals(station)
+                     if self._railway.signalling.find_path(signal.pose, exit[0].pose, ignore_locks=True) is not None]
+            self._reachable[key] = sorted(exits, key=lambda exit: signal.node.heuristic_to(exit[0].node))
+        return self._reachable[key]
+
+    def _exit_signals(self, station: Station) -> list[tuple[Signal, Direction]]:
+        """First signals past either end of each platform of the station, with the direction out of that end."""
+        if station.id in self._exits:
+            return self._exits[station.id]
+        exits: list[tuple[Signal, Direction]] = []
+        for platform in station.platforms:
+            nodes = [node for edge in platform for node in (edge.a, edge.b)]
+            for edge in platform:
+                for inner, end in ((edge.a, edge.b), (edge.b, edge.a)):
+                    if nodes.count(end) == 1:
+                        start = Pose.from_nodes(inner, end)
+                        exits.extend((signal, start.direction) for signal in self._first_signals(start)
+                                     if all(signal is not other for other, _ in exits))
+        self._exits[station.id] = exits
+        return exits
+
+    def _first_signals(self, start: Pose) -> list[Signal]:
+        found: list[Signal] = []
+        queue = deque([(start, 0)])
+        visited = {start}
+        while queue:
+            pose, depth = queue.popleft()
+            if self._railway.signals.has_with_pose(pose):
+                found.append(self._railway.signals.get(pose.node))
+                continue
+            if depth == _EXIT_SEARCH_DEPTH:
+                continue
+            for neighbor in self._railway.graph_service.get_turn_neighbors(pose):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    queue.append((neighbor, depth + 1))
+        return found
+
+    def _turn_around(self, train: Train) -> None:
+        """Give a train standing at its terminus the next free service from there, reversed."""
+        station_id = self._railway.stations.get_edge_station(train.get_occupied_rails()[-1].edge)
+        if station_id is None:
+            self._turning.discard(train.id)
+            return
+        now = self._railway.time.in_minutes()
+        services: list[tuple[int, str]] = []
+        for timetable in self._railway.timetables.all():
+            if not timetable.stops or timetable.stops[0]['station'].id != station_id:
+                continue
+            start_time = next((t for t in timetable.start_times if t >= now), None)
+            if start_time is not None:
+                services.append((start_time, timetable.code))
+        if not services:
+            return
+        start_time, code = min(services)
+        self._turning.discard(train.id)
+        self._executor.reverse_train(train)
+        self._executor.set_schedule(train, code, start_time)
+        self._executor.start_train(train)
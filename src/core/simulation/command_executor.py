@@ -0,0 +1,119 @@
+from core.models.geometry.node import Node
+from core.models.signal import Signal
+from core.models.train import Train
+from core.simulation.command_log import CommandKind, CommandLog
+from core.simulation.event_engine import EventEngine
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from core.models.railway.railway_system import RailwaySystem
+
+
+class CommandExecutor:
+    """Applies dispatcher commands to the railway and records each one with the tick it happened at.
+
+    The simulation has to be advanced through the executor as well, that is what the tick
+    index counts. Replaying the log against the same map reproduces the session exactly.
+    """
+    def __init__(self, railway: 'RailwaySystem', log: CommandLog):
+        self._railway = railway
+        self._engine = EventEngine(railway)
+        self._tick = 0
+        self.log = log
+        self._handlers = {
+            CommandKind.CONNECT_SIGNALS: self._connect_signals,
+            CommandKind.AUTO_CONNECT_SIGNALS: self._auto_connect_signals,
+            CommandKind.DROP_SIGNAL: self._drop_signal,
+            CommandKind.BLOCK_NODE: self._block_node,
+            CommandKind.UNBLOCK_NODE: self._unblock_node,
+            CommandKind.REMOVE_BLOCKED_NODES: self._remove_blocked_nodes,
+            CommandKind.START_TRAIN: lambda train_id: self._train(train_id).start(),
+            CommandKind.SHUTDOWN_TRAIN: lambda train_id: self._train(train_id).shutdown(),
+            CommandKind.REVERSE_TRAIN: lambda train_id: self._train(train_id).reverse(),
+            CommandKind.SET_SCHEDULE: self._set_schedule,
+            CommandKind.REMOVE_SCHEDULE: lambda train_id: self._train(train_id).remove_schedule(),
+        }
+
+    @property
+    def tick(self) -> int:
+        """Number of ticks advanced so far."""
+        return self._tick
+
+    def advance(self, ticks: int) -> None:
+        self._engine.advance(ticks)
+        self._tick += ticks
+
+    def execute(self, kind: CommandKind, *args):
+        """Record and apply a command given in its serialized form, returns what the railway returned."""
+        self.log.record(self._tick, kind, *args)
+        return self._handlers[kind](*args)
+
+    def connect_signals(self, from_signal: Signal, to_signal: Signal) -> bool:
+        return self.execute(CommandKind.CONNECT_SIGNALS, list(from_signal.node), list(to_signal.node))
+
+    def auto_connect_signals(self, from_signal: Signal, to_signal: Signal) -> str | None:
+        return self.execute(CommandKind.AUTO_CONNECT_SIGNALS, list(from_signal.node), list(to_signal.node))
+
+    def drop_signal(self, signal: Signal) -> None:
+        self.execute(CommandKind.DROP_SIGNAL, list(signal.node))
+
+    def block_node(self, node: Node) -> None:
+        self.execute(CommandKind.BLOCK_NODE, list(node))
+
+    def unblock_node(self, node: Node) -> None:
+        self.execute(CommandKind.UNBLOCK_NODE, list(node))
+
+    def remove_blocked_nodes(self) -> None:
+        self.execute(CommandKind.REMOVE_BLOCKED_NODES)
+
+    def start_train(self, train: Train) -> None:
+        self.execute(CommandKind.START_TRAIN, train.id)
+
+    def shutdown_train(self, train: Train) -> None:
+        self.execute(CommandKind.SHUTDOWN_TRAIN, train.id)
+
+    def reverse_train(self, train: Train) -> None:
+        self.execute(CommandKind.REVERSE_TRAIN, train.id)
+
+    def set_schedule(self, train: Train, timetable_code: str, start_time: int) -> None:
+        self.execute(CommandKind.SET_SCHEDULE, train.id, timetable_code, start_time)
+
+    def remove_schedule(self, train: Train) -> None:
+        self.execute(CommandKind.REMOVE_SCHEDULE, train.id)
+
+    def _node(self, data: list) -> Node:
+        x, y, level = data
+        return Node(x, y, level)
+
+    def _signal(self, node_data: list) -> Signal:
+        signal = self._railway.signals.get(self._node(node_data))
+        if signal is None:
+            raise ValueError(f"No signal at {node_data}.")
+        return signal
+
+    def _train(self, train_id: int) -> Train:
+        return self._railway.trains.get(train_id)
+
+    def _connect_signals(self, from_node: list, to_node: list) -> bool:
+        return self._railway.signalling.connect_signals(self._signal(from_node), self._signal(to_node))
+
+    def _auto_connect_signals(self, from_node: list, to_node: list) -> str | None:
+        return self._railway.signalling.auto_connect_signals(self._signal(from_node), self._signal(to_node))
+
+    def _drop_signal(self, node: list) -> None:
+        self._railway.signalling.drop_signal(self._signal(node))
+
+    def _block_node(self, node: list) -> None:
+        self._railway.graph.block_node(self._node(node))
+
+    def _unblock_node(self, node: list) -> None:
+        self._railway.graph.unblock_node(self._node(node))
+
+    def _remove_blocked_nodes(self) -> None:
+        self._railway.graph.remove_blocked_nodes()
+
+    def _set_schedule(self, train_id: int, timetable_code: str, start_time: int) -> None:
+        timetable = self._railway.timetables.get_by_code(timetable_code)
+        if timetable is None:
+            raise ValueError(f"No timetable with code '{timetable_code}'.")
+        self._train(train_id).set_schedule(timetable.create_schedule(start_time))
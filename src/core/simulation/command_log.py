@@ -0,0 +1,59 @@
+from dataclasses import dataclass, field
+from enum import Enum
+
+
+class CommandKind(Enum):
+    CONNECT_SIGNALS = "connect"
+    AUTO_CONNECT_SIGNALS = "auto_connect"
+    DROP_SIGNAL = "drop"
+    BLOCK_NODE = "block"
+    UNBLOCK_NODE = "unblock"
+    REMOVE_BLOCKED_NODES = "clear_blocks"
+    START_TRAIN = "start"
+    SHUTDOWN_TRAIN = "shutdown"
+    REVERSE_TRAIN = "reverse"
+    SET_SCHEDULE = "set_schedule"
+    REMOVE_SCHEDULE = "remove_schedule"
+
+
+@dataclass(frozen=True)
+class Command:
+    """A dispatcher action and the simulation tick it was applied before.
+
+    Arguments are kept in their serialized form ([x, y, level] nodes, train ids, timetable codes),
+    so a command refers to the same objects in any railway loaded from the same map.
+    """
+    tick: int
+    kind: CommandKind
+    args: tuple = ()
+
+    def to_list(self) -> list:
+        return [self.tick, self.kind.value, *self.args]
+
+    @classmethod
+    def from_list(cls, data: list) -> 'Command':
+        tick, kind, *args = data
+        return cls(tick, CommandKind(kind), tuple(args))
+
+
+@dataclass
+class CommandLog:
+    """Everything needed to repeat a simulation session on the same map."""
+    start_time: str
+    commands: list[Command] = field(default_factory=list)
+
+    def record(self, tick: int, kind: CommandKind, *args) -> None:
+        self.commands.append(Command(tick, kind, args))
+
+    def to_dict(self) -> dict:
+        return {
+            'start_time': self.start_time,
+            'commands': [command.to_list() for command in self.commands],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CommandLog':
+        commands = [Command.from_list(command) for command in data['commands']]
+        if any(a.tick > b.tick for a, b in zip(commands, commands[1:])):
+            raise ValueError("Commands must be in tick order.")
+        return cls(data['start_time'], commands)
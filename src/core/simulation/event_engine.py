@@ -0,0 +1,76 @@
+import heapq
+from math import inf
+
+from core.models.train import DT
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from core.models.railway.railway_system import RailwaySystem
+
+
+class EventEngine:
+    """Advances the railway like calling RailwaySystem.tick once per step.
+
+    Trains cruising at line speed, dwelling at a platform or held at a signal are
+    fast-forwarded instead of ticked. Each train's next tick that can change something
+    (edge boundary, start of braking, departure, path change) goes on a priority queue.
+    The ticks up to the next event cost nothing, the clock and the coasting trains are
+    moved over them in one step. Positions may differ from ticking in the last few bits,
+    coast_ticks stops short of every boundary so no event comes out differently.
+    """
+    def __init__(self, railway: 'RailwaySystem'):
+        self._railway = railway
+
+    def advance(self, ticks: int) -> None:
+        # trains, signals and schedules may have been edited since the last call, plan from scratch
+        trains = self._railway.trains.all()
+        due: list[int | float] = [0] * len(trains)
+        synced: list[int] = [0] * len(trains)
+        revisions: list[int] = [0] * len(trains)
+        queue: list[tuple[int | float, int]] = []
+
+        def plan(index: int, tick: int) -> None:
+            train = trains[index]
+            due[index] = tick + train.coast_ticks()
+            revisions[index] = train._revision
+            heapq.heappush(queue, (due[index], index))
+
+        def sync(index: int, tick: int) -> None:
+            """Apply the coasted ticks before the given tick."""
+            trains[index].coast(tick - synced[index])
+            synced[index] = tick
+
+        for index in range(len(trains)):
+            plan(index, 0)
+
+        tick = 0
+        time = self._railway.time
+        while True:
+            while queue and queue[0][0] != due[queue[0][1]]:
+                heapq.heappop(queue) # superseded by a later plan
+            next_event = queue[0][0] if queue else inf
+            if next_event >= ticks:
+                break
+
+            time.add((next_event - tick + 1) * DT) # the ticks skipped and the one of the event
+            tick = next_event
+
+            for index in range(len(trains)):
+                sync(index, tick)
+            # same order as RailwaySystem.tick, a train may change the plans of the ones after it
+            ticked = set()
+            for index, train in enumerate(trains):
+                if due[index] == tick or train._revision != revisions[index]:
+                    train.tick()
+                    ticked.add(index)
+                else:
+                    train.coast(1)
+                synced[index] = tick + 1
+            for index, train in enumerate(trains):
+                if index in ticked or train._revision != revisions[index]:
+                    plan(index, tick + 1)
+            tick += 1
+
+        time.add((ticks - tick) * DT)
+        for index in range(len(trains)):
+            sync(index, ticks)
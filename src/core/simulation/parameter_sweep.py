@@ -0,0 +1,173 @@
+import copy
+from dataclasses import dataclass, fields
+import itertools
+from multiprocessing import Pool
+import time
+from typing import Iterator
+
+from core.config.config import Config
+from core.models.railway.railway_system import RailwaySystem
+from core.models.schedule import Schedule
+from core.models.train import Train
+from core.models.train_config import TrainConfig
+from core.simulation.auto_dispatcher import AutoDispatcher
+from core.simulation.command_executor import CommandExecutor
+from core.simulation.command_log import CommandLog
+from core.simulation.simulation_runner import SimulationRunner
+
+SAMPLE_INTERVAL = 60  # simulated seconds between punctuality samples
+
+
+@dataclass(frozen=True)
+class SweepParameters:
+    """One point of the grid, None keeps the value stored in the map."""
+    frequency: int | None = None  # minutes between services, every timetable
+    first_train: int | None = None  # minutes after midnight, every timetable
+    last_train: int | None = None
+    acceleration: float | None = None  # m/s2, every train
+    deceleration: float | None = None
+    car_count: int | None = None
+
+    def apply(self, map_data: dict) -> dict:
+        """Return a copy of the map data with the parameters filled in."""
+        data = copy.deepcopy(map_data)
+        timetable_keys = {'frequency': self.frequency, 'first_train': self.first_train, 'last_train': self.last_train}
+        for timetable in data['timetable_repository']:
+            timetable.update((key, value) for key, value in timetable_keys.items() if value is not None)
+        config_keys = {'acceleration_in_m_s2': self.acceleration, 'deceleration_in_m_s2': self.deceleration, 'car_count': self.car_count}
+        for train in data['train_repository']['trains']:
+            train['config'].update((key, value) for key, value in config_keys.items() if value is not None)
+        return data
+
+    def label(self) -> str:
+        return " ".join(f"{f.name}={getattr(self, f.name)}" for f in fields(self) if getattr(self, f.name) is not None) or "map"
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    parameters: SweepParameters
+    samples: int  # live scheduled train samples, one per train per SAMPLE_INTERVAL
+    late_samples: int
+    stops_served: int  # departures plus arrivals at a terminus
+    services_completed: int
+    simulated_seconds: float
+    wall_seconds: float
+    error: str | None = None
+
+    @property
+    def punctuality(self) -> float:
+        """Share of samples in which a scheduled train was not late."""
+        if self.samples == 0:
+            return 1.0
+        return 1.0 - self.late_samples / self.samples
+
+    @property
+    def throughput(self) -> float:
+        """Stops served per simulated hour."""
+        if self.simulated_seconds == 0.0:
+            return 0.0
+        return self.stops_served * 3600 / self.simulated_seconds
+
+
+def grid(**values: list) -> list[SweepParameters]:
+    """Every combination of the given values, e.g. grid(frequency=[10, 20], car_count=[4, 6])."""
+    names = list(values)
+    return [SweepParameters(**dict(zip(names, combination))) for combination in itertools.product(*values.values())]
+
+
+class _Tally:
+    """Punctuality and progress sampled from the trains between simulation chunks."""
+    def __init__(self):
+        self.samples = 0
+        self.late_samples = 0
+        self.stops_served = 0
+        self.services_completed = 0
+        self._seen: dict[int, tuple[Schedule, int]] = {}
+
+    def sample(self, trains: list[Train]) -> None:
+        for train in trains:
+            schedule = train.schedule
+            seen = self._seen.get(train.id)
+            if seen is not None:
+                old_schedule, old_index = seen
+                if old_schedule is schedule:
+                    self.stops_served += schedule.index - old_index
+                elif old_schedule.index == len(old_schedule.stops) - 1:
+                    # the schedule is dropped once the train stands at its terminus, maybe replaced by the next already
+                    self.stops_served += old_schedule.index - old_index + 1
+                    self.services_completed += 1
+            if schedule is None:
+                self._seen.pop(train.id, None)
+                continue
+            self._seen[train.id] = (schedule, schedule.index)
+            if train.live:
+                self.samples += 1
+                self.late_samples += train.is_late()
+
+
+def _check_fit(railway: RailwaySystem, car_count: int) -> None:
+    """Trains keep their stored rear position, a longer train must still end on its stored path."""
+    for train in railway.trains.all():
+        length = TrainConfig(car_count=car_count).total_length
+        if train._path_distance + length > sum(rail.length for rail in train.path):
+            raise ValueError(f"Train {train.id} with {car_count} cars does not fit on its track.")
+
+
+def run_variant(map_data: dict, parameters: SweepParameters, start_time: str, duration: float,
+                start_trains: bool = True, log_data: dict | None = None, auto_dispatch: bool = False) -> SweepResult:
+    """Simulate one point of the grid, event driven, from start_time for duration seconds.
+
+    The routes come from the replayed log or, with auto_dispatch, from the automatic dispatcher.
+    """
+    started = time.perf_counter()
+    tally = _Tally()
+    try:
+        railway = RailwaySystem()
+        if parameters.car_count is not None:
+            railway.replace_from_dict(map_data)
+            _check_fit(railway, parameters.car_count)
+        railway.replace_from_dict(parameters.apply(map_data))
+
+        log = CommandLog.from_dict(log_data) if log_data is not None else CommandLog(start_time)
+        runner = SimulationRunner(railway)
+        runner.prepare(log.start_time)
+        if start_trains and log_data is None:
+            runner.start_trains()
+
+        executor = CommandExecutor(railway, CommandLog(log.start_time))
+        advance = AutoDispatcher(railway, executor).advance if auto_dispatch else executor.advance
+        commands = iter(log.commands)
+        total_ticks = round(duration * Config.SIMULATION_TICK_RATE)
+        sample_ticks = SAMPLE_INTERVAL * Config.SIMULATION_TICK_RATE
+        command = next(commands, None)
+        next_sample = sample_ticks
+        while executor.tick < total_ticks:
+            target = min(next_sample, total_ticks)
+            while command is not None and command.tick <= target:
+                advance(command.tick - executor.tick)
+                executor.execute(command.kind, *command.args)
+                command = next(commands, None)
+            advance(target - executor.tick)
+            if target == next_sample:
+                tally.sample(railway.trains.all())
+                next_sample += sample_ticks
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return SweepResult(
+        parameters, tally.samples, tally.late_samples, tally.stops_served, tally.services_completed,
+        duration if error is None else 0.0, time.perf_counter() - started, error,
+    )
+
+
+def _run_variant_args(args: tuple) -> SweepResult:
+    return run_variant(*args)
+
+
+def run_sweep(map_data: dict, variants: list[SweepParameters], start_time: str, duration: float,
+              start_trains: bool = True, log_data: dict | None = None, workers: int | None = None,
+              auto_dispatch: bool = False) -> Iterator[SweepResult]:
+    """Run the variants in a process pool, yields results in the order of variants."""
+    tasks = [(map_data, parameters, start_time, duration, start_trains, log_data, auto_dispatch) for parameters in variants]
+    with Pool(workers) as pool:
+        yield from pool.imap(_run_variant_args, tasks)
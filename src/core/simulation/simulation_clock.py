@@ -0,0 +1,54 @@
+import time
+from typing import Callable
+
+from core.config.config import Config
+
+
+class SimulationClock:
+    """Turns elapsed wall time into a whole number of fixed-length simulation ticks."""
+    def __init__(self, tick_rate: int = Config.SIMULATION_TICK_RATE):
+        self._tick_rate = tick_rate
+        self._accumulator: float = 0.0  # ticks owed but not yet run
+        self._last_time: float | None = None
+        self._batch: int = Config.SIMULATION_TICK_BATCH
+
+    def pause(self) -> None:
+        """Forget the last timestamp so time spent paused is not caught up on resume."""
+        self._last_time = None
+        self._accumulator = 0.0
+
+    def _elapsed(self) -> float:
+        now = time.perf_counter()
+        elapsed = 0.0 if self._last_time is None else now - self._last_time
+        self._last_time = now
+        # a stalled frame (window drag, breakpoint) must not turn into an avalanche of ticks
+        return min(elapsed, Config.MAX_SIMULATION_CATCH_UP)
+
+    def ticks_due(self, speed: float) -> int:
+        """Number of ticks to run now to keep simulated time at speed times wall time."""
+        self._accumulator += self._elapsed() * speed * self._tick_rate
+        ticks = int(self._accumulator)
+        self._accumulator -= ticks
+        return ticks
+
+    def run_for_budget(self, advance: Callable[[int], None]) -> int:
+        """Advance in batches until this frame's share of the frame period is used up, returns the tick count."""
+        # the rest of the frame period is left for events and the single render
+        budget = Config.MAX_SPEED_FRAME_SHARE / Config.FPS
+        deadline = time.perf_counter() + budget
+        ticks = 0
+        while True:
+            batch_start = time.perf_counter()
+            advance(self._batch)
+            ticks += self._batch
+            now = time.perf_counter()
+            # the deadline is only checked between batches, keep a few of them per frame
+            if now - batch_start < budget / 8:
+                self._batch *= 2
+            elif now - batch_start > budget / 4 and self._batch > 1:
+                self._batch //= 2
+            if now >= deadline:
+                break
+        self._last_time = time.perf_counter()
+        self._accumulator = 0.0
+        return ticks
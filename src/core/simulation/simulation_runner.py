@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+import time
+
+from core.config.config import Config
+from core.models.train import DT
+from core.simulation.auto_dispatcher import AutoDispatcher
+from core.simulation.command_executor import CommandExecutor
+from core.simulation.command_log import CommandLog
+from core.simulation.event_engine import EventEngine
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from core.models.railway.railway_system import RailwaySystem
+
+
+@dataclass(frozen=True)
+class RunReport:
+    ticks: int
+    simulated_seconds: float
+    wall_seconds: float
+
+    @property
+    def speedup(self) -> float:
+        """Simulated seconds per wall-clock second."""
+        if self.wall_seconds == 0.0:
+            return float('inf')
+        return self.simulated_seconds / self.wall_seconds
+
+
+class SimulationRunner:
+    """Advances a railway without any window, as fast as the CPU allows."""
+    def __init__(self, railway: 'RailwaySystem'):
+        self._railway = railway
+
+    def prepare(self, start_time: str) -> None:
+        """Set the clock and reset signalling the same way entering simulation mode does."""
+        if not self._railway.time.set_time_from_string(start_time):
+            raise ValueError(f"Invalid start time '{start_time}', use HH:MM.")
+
+        self._railway.trains.save_state()
+        self._railway.signalling.unlock_all_paths()
+        self._railway.signalling.lock_paths_under_trains()
+
+        self._railway.timetables.calculate_start_times()
+        self._railway.signalling.reset()
+        self._railway.signals.reset_all()
+
+    def start_trains(self, executor: CommandExecutor | None = None) -> int:
+        """Give every train the next free service of a timetable (round robin) and start it, returns the count started.
+
+        Through an executor, the schedules and starts are recorded in its log.
+        """
+        timetables = [timetable for timetable in self._railway.timetables.all() if timetable.stops]
+        started = 0
+        for index, train in enumerate(self._railway.trains.all()):
+            if timetables:
+                timetable = timetables[index % len(timetables)]
+                if timetable.start_times:
+                    start_time = next(
+                        (t for t in timetable.start_times if t >= self._railway.time.in_minutes()),
+                        timetable.start_times[0]
+                    )
+                    if executor is not None:
+                        executor.set_schedule(train, timetable.code, start_time)
+                    else:
+                        train.set_schedule(timetable.create_schedule(start_time))
+            if executor is not None:
+                executor.start_train(train)
+            else:
+                train.start()
+            started += 1
+        return started
+
+    def step(self) -> None:
+        self._railway.time.add(DT)
+        self._railway.tick()
+
+    def run(self, duration: float, event_driven: bool = True) -> RunReport:
+        """Simulate the given number of seconds and report how fast it went.
+        
+        Both engines produce the same result up to rounding, the per-tick one is kept for comparison.
+        """
+        ticks = round(duration * Config.SIMULATION_TICK_RATE)
+        start = time.perf_counter()
+        if event_driven:
+            EventEngine(self._railway).advance(ticks)
+        else:
+            for _ in range(ticks):
+                self.step()
+        wall_seconds = time.perf_counter() - start
+        return RunReport(ticks, ticks * DT, wall_seconds)
+    
+    def run_dispatched(self, duration: float, log: CommandLog, start_trains: bool = False) -> RunReport:
+        """Simulate the given number of seconds with the automatic dispatcher setting the routes.
+
+        Every command, including starting the trains, goes to the log, so replaying it repeats the run.
+        """
+        ticks = round(duration * Config.SIMULATION_TICK_RATE)
+        executor = CommandExecutor(self._railway, log)
+        dispatcher = AutoDispatcher(self._railway, executor)
+        start = time.perf_counter()
+        if start_trains:
+            self.start_trains(executor)
+        dispatcher.advance(ticks)
+        wall_seconds = time.perf_counter() - start
+        return RunReport(ticks, ticks * DT, wall_seconds)
+
+    def replay(self, log: CommandLog, duration: float | None = None) -> RunReport:
+        """Re-apply a recorded session, event driven, until the last command or for the given number of seconds."""
+        ticks = log.commands[-1].tick if log.commands else 0
+        if duration is not None:
+            ticks = round(duration * Config.SIMULATION_TICK_RATE)
+        executor = CommandExecutor(self._railway, CommandLog(log.start_time))
+        start = time.perf_counter()
+        for command in log.commands:
+            if command.tick > ticks:
+                break
+            executor.advance(command.tick - executor.tick)
+            executor.execute(command.kind, *command.args)
+        executor.advance(ticks - executor.tick)
+        wall_seconds = time.perf_counter() - start
+        return RunReport(ticks, ticks * DT, wall_seconds)
@@ -0,0 +1,63 @@
+import argparse
+import json
+
+from core.models.railway.railway_system import RailwaySystem
+from core.simulation.command_log import CommandLog
+from core.simulation.simulation_runner import SimulationRunner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the simulation without a window.")
+    parser.add_argument("map", help="map JSON file, e.g. maps/142.json")
+    parser.add_argument("--start", default=None, help="simulation start time (HH:MM), 06:00 unless replaying")
+    parser.add_argument("--duration", type=float, default=None, help="simulated seconds to run, 3600 or up to the last replayed command")
+    parser.add_argument("--engine", choices=("event", "tick"), default="event", help="event driven or one tick at a time")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--start-trains", action="store_true", help="schedule and start every train before running")
+    source.add_argument("--replay", metavar="LOG", help="command log recorded in simulation mode, for the same map")
+    parser.add_argument("--auto-dispatch", action="store_true", help="let the automatic dispatcher set the routes")
+    parser.add_argument("--save-log", metavar="LOG", help="write the automatic dispatcher's commands, for --replay")
+    args = parser.parse_args()
+    if args.auto_dispatch and (args.replay is not None or args.engine != "event"):
+        parser.error("--auto-dispatch sets the routes itself, on the event driven engine")
+    if args.save_log is not None and not args.auto_dispatch:
+        parser.error("--save-log needs --auto-dispatch")
+
+    railway = RailwaySystem()
+    with open(args.map, 'r', encoding='utf-8') as f:
+        railway.replace_from_dict(json.load(f))
+
+    log = None
+    if args.replay is not None:
+        if args.start is not None or args.engine != "event":
+            parser.error("--replay uses the start time of the log and the event driven engine")
+        with open(args.replay, 'r', encoding='utf-8') as f:
+            log = CommandLog.from_dict(json.load(f))
+
+    runner = SimulationRunner(railway)
+    try:
+        runner.prepare(log.start_time if log is not None else args.start or "06:00")
+    except ValueError as e:
+        parser.error(str(e))
+    if args.start_trains and not args.auto_dispatch:
+        print(f"started {runner.start_trains()} trains")
+
+    if log is not None:
+        report = runner.replay(log, args.duration)
+        print(f"replayed {len(log.commands)} commands")
+    elif args.auto_dispatch:
+        dispatched = CommandLog(args.start or "06:00")
+        report = runner.run_dispatched(3600.0 if args.duration is None else args.duration, dispatched, args.start_trains)
+        print(f"dispatcher gave {len(dispatched.commands)} commands")
+        if args.save_log is not None:
+            with open(args.save_log, 'w', encoding='utf-8') as f:
+                json.dump(dispatched.to_dict(), f)
+    else:
+        report = runner.run(3600.0 if args.duration is None else args.duration, event_driven=args.engine == "event")
+    hours, minutes, seconds = railway.time.get_hms()
+    print(f"simulated {report.simulated_seconds:.0f} s in {report.wall_seconds:.2f} s "
+          f"({report.ticks} ticks), {report.speedup:.0f} sim-s/wall-s, clock {hours}:{minutes.zfill(2)}:{seconds.zfill(2)}")
+
+
+if __name__ == "__main__":
+    main()
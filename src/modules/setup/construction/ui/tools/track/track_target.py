@@ -36,7 +36,7 @@ def find_track_target(railway: RailwaySystem, world_pos: Position, construction_
     if snapped.x == construction_anchor.node.x and snapped.y == construction_anchor.node.y:
         return TrackTarget(kind=TrackTargetType.ANCHOR_SAME, node=snapped)
     
-    found_path = railway.pathfinder.find_grid_path(construction_anchor, snapped)
+    found_path = railway.pathfinder.preview_grid_path(construction_anchor, snapped)
     if found_path is None:
         return TrackTarget(kind=TrackTargetType.NO_PATH, node=snapped)
 
@@ -47,7 +47,7 @@ def find_tunnel_target(railway: RailwaySystem, world_pos: Position, construction
         return TunnelTarget(kind=TunnelTargetType.ANCHOR, anchor=Pose.from_nodes(neighbor, snapped), node=snapped)
 
     
-    found_path = railway.pathfinder.find_tunnel_path(construction_anchor, Pose.from_nodes(snapped, neighbor).get_previous_in_direction())
+    found_path = railway.pathfinder.preview_tunnel_path(construction_anchor, Pose.from_nodes(snapped, neighbor).get_previous_in_direction())
     if found_path is None:
         return TunnelTarget(kind=TunnelTargetType.NO_PATH, node=snapped)
     
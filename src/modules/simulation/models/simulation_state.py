@@ -3,7 +3,6 @@ from core.models.geometry.edge import Edge
 from core.models.signal import Signal
 from typing import Callable, Optional
 from enum import Enum
-from core.config.config import Config
 from core.models.time import Time
 
 class TimeControlMode(Enum):
@@ -11,13 +10,16 @@ class TimeControlMode(Enum):
     PLAY = 1
     FAST_FORWARD = 5
     SUPER_FAST_FORWARD = 30
+    MAX_SPEED = float('inf')  # as many ticks as fit in each frame
     
 
 class TimeControlState:
     mode: TimeControlMode = TimeControlMode.PAUSE
+    auto_dispatch: bool = False  # the automatic dispatcher sets the routes while time runs
     def reset(self) -> None:
         """Reset the time control state to its initial values."""
         self.mode = TimeControlMode.PAUSE
+        self.auto_dispatch = False
         self.time = Time(0)
         
     @property
@@ -29,6 +31,9 @@ class TimeControlState:
         
     def toggle_pause(self) -> None:
         self.mode = TimeControlMode.PLAY if self.paused else TimeControlMode.PAUSE
+
+    def toggle_auto_dispatch(self) -> None:
+        self.auto_dispatch = not self.auto_dispatch
     
 @dataclass
 class SimulationPreview:
@@ -54,10 +59,6 @@ class SimulationState:
     _train_selected_callback: Optional[Callable] = None
     _train_deselected_callback: Optional[Callable] = None
     
-    def tick(self) -> None:
-        """Advance the current time by the specified number of seconds."""
-        self.time.add(1 * self.time_control.mode.value / Config.FPS)
-        
     def select_train(self, train_id: int) -> None:
         if train_id not in self.selected_trains:
             self.selected_trains.add(train_id)
@@ -1,3 +1,8 @@
+import json
+import os
+import time
+
+from core.config.config import Config
 from core.graphics.graphics_context import GraphicsContext
 from shared.models.app_state import AppState
 from modules.simulation.ui.end_simulation_button import EndSimulationButton
@@ -12,6 +17,8 @@ from shared.controllers.camera_controller import CameraController
 from modules.simulation.ui.simulation_controller import SimulationController
 from core.models.railway.railway_system import RailwaySystem
 from modules.simulation.models.simulation_state import SimulationState
+from core.simulation.command_executor import CommandExecutor
+from core.simulation.command_log import CommandLog
 from typing import Callable
 
 class SimulationMode(UIController, FullScreenUIComponent):
@@ -44,14 +51,16 @@ class SimulationMode(UIController, FullScreenUIComponent):
             return
         
         self._state = SimulationState(self._railway.time)
+        self._executor = CommandExecutor(self._railway, CommandLog(time_str))
+        self._controller = SimulationController(self._railway, self._state, self._graphics, self._executor)
         self.elements = (
-            EndSimulationButton(self._graphics.screen, self._app_state.end_simulation),
+            EndSimulationButton(self._graphics.screen, self._end_simulation),
             TimeControlButtons(self._state.time_control, self._graphics.screen),
             TimeDisplay(self._state.time, self._graphics),
-            TrainPanelManager(self._railway, self._state, self._graphics.screen, self._railway.timetables),
+            TrainPanelManager(self._railway, self._state, self._graphics.screen, self._railway.timetables, self._executor),
             ZoomButton(self._graphics.screen, self._graphics.camera),
             CameraController(self._graphics.camera),
-            SimulationController(self._railway, self._state, self._graphics),
+            self._controller,
         )
         self._railway.trains.save_state()
         self._railway.signalling.unlock_all_paths()
@@ -60,4 +69,19 @@ class SimulationMode(UIController, FullScreenUIComponent):
         self._railway.timetables.calculate_start_times()
         self._railway.signalling.reset()
         self._railway.signals.reset_all()
-        
\ No newline at end of file
+        
+    def _end_simulation(self) -> None:
+        self._save_command_log()
+        self._controller.close()
+        self._app_state.end_simulation()
+        
+    def _save_command_log(self) -> None:
+        """Write the session's commands to the logs folder, replay them with headless.py --replay."""
+        log = self._executor.log
+        if not log.commands:
+            return
+        map_name = os.path.splitext(os.path.basename(self._app_state.filepath or "untitled"))[0]
+        os.makedirs(Config.COMMAND_LOGS_FOLDER, exist_ok=True)
+        filename = f"{map_name}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(os.path.join(Config.COMMAND_LOGS_FOLDER, filename), 'w', encoding='utf-8') as f:
+            json.dump(log.to_dict(), f)
@@ -7,12 +7,14 @@ from modules.simulation.models.simulation_state import SimulationState
 from modules.simulation.ui.panel.schedule_selector import ScheduleSelector
 from core.models.repositories.timetable_repository import TimetableRepository
 from core.config.color import Color
+from core.simulation.command_executor import CommandExecutor
 from shared.ui.models.panel import Panel
 
 class TrainPanel(Panel):
     _selected: bool = False
-    def __init__(self, train: Train, screen: pygame.Surface, index: int, timetable_repository: TimetableRepository, simulation_state: SimulationState):
+    def __init__(self, train: Train, screen: pygame.Surface, index: int, timetable_repository: TimetableRepository, simulation_state: SimulationState, executor: CommandExecutor):
         self._train = train
+        self._executor = executor
         self._schedule_selector = None
         self._schedule_repository = timetable_repository
         self._state = simulation_state
@@ -73,20 +75,20 @@ class TrainPanel(Panel):
         
         if self._train.live:
             if self.shut_down_button.collidepoint(*event.screen_pos) and self._train.speed == 0.0:
-                self._train.shutdown()
+                self._executor.shutdown_train(self._train)
         else:
             if self._train.schedule:
                 if self.change_schedule_button.collidepoint(*event.screen_pos):
                     self._open_schedule_selector()
                 elif self.remove_schedule_button.collidepoint(*event.screen_pos):
-                    self._train.remove_schedule()
+                    self._executor.remove_schedule(self._train)
             else:
                 if self.add_schedule_button.collidepoint(*event.screen_pos):
                     self._open_schedule_selector()
             if self.startup_button.collidepoint(*event.screen_pos):
-                self._train.start()
+                self._executor.start_train(self._train)
             elif self.reverse_button.collidepoint(*event.screen_pos):
-                self._train.reverse()
+                self._executor.reverse_train(self._train)
                 
 
     def _render_speed(self):
@@ -175,7 +177,7 @@ class TrainPanel(Panel):
 
     def _on_schedule_chosen(self, timetable: Timetable, start_time: int):
         self._schedule_selector = None
-        self._train.set_schedule(timetable.create_schedule(start_time))
+        self._executor.set_schedule(self._train, timetable.code, start_time)
 
     def _init_buttons(self):
         self.close_button = pygame.Rect(self._rect.right - 40, self._rect.top + 10, 40, 20)
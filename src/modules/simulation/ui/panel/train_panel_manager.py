@@ -5,14 +5,16 @@ from core.models.repositories.timetable_repository import TimetableRepository
 import pygame
 import time
 from core.models.railway.railway_system import RailwaySystem
+from core.simulation.command_executor import CommandExecutor
 
 
 class TrainPanelManager(UIController):
     panels : dict[int, 'TrainPanel']
     _panel_selected_at: dict[int, float]
     
-    def __init__(self, railway: RailwaySystem, simulation_state: SimulationState, screen: pygame.Surface, timetable_repository: TimetableRepository):
+    def __init__(self, railway: RailwaySystem, simulation_state: SimulationState, screen: pygame.Surface, timetable_repository: TimetableRepository, executor: CommandExecutor):
         self.panels = {}
+        self._executor = executor
         self._panel_selected_at = {}
         self._railway = railway
         self._state = simulation_state
@@ -34,7 +36,7 @@ class TrainPanelManager(UIController):
                 new_index = self.panels[oldest_train_id].index
                 self._state.deselect_train(oldest_train_id)
             
-            self.panels[train_id] = TrainPanel(train, self._screen, new_index, self._timetable_repository, self._state)
+            self.panels[train_id] = TrainPanel(train, self._screen, new_index, self._timetable_repository, self._state, self._executor)
         
         # Update timestamp so this train becomes the youngest
         self._panel_selected_at[train_id] = time.time()
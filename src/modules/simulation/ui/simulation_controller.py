@@ -7,17 +7,27 @@ from shared.ui.models.clickable_ui_component import ClickableUIComponent
 from modules.simulation.ui.simulation_view import SimulationView
 from core.graphics.graphics_context import GraphicsContext
 from core.models.event import Event
+from core.simulation.simulation_clock import SimulationClock
+from core.simulation.command_executor import CommandExecutor
+from core.simulation.auto_dispatcher import AutoDispatcher
+from modules.simulation.models.simulation_state import TimeControlMode
 import pygame
 
 
 class SimulationController(ClickableUIComponent, FullScreenUIComponent):
     handled_events = [pygame.MOUSEBUTTONUP]
-    def __init__(self, railway: RailwaySystem, simulation_state: SimulationState, graphics: GraphicsContext):
+    def __init__(self, railway: RailwaySystem, simulation_state: SimulationState, graphics: GraphicsContext, executor: CommandExecutor):
         self.view = SimulationView(railway, simulation_state, graphics)
         self._state = simulation_state
         self._railway = railway
         self._graphics = graphics
+        self._clock = SimulationClock()
+        self._executor = executor
+        self._dispatcher = AutoDispatcher(railway, executor)
 
+    def close(self) -> None:
+        """Detach from the railway when the simulation ends."""
+        self._dispatcher.close()
 
     def _on_click(self, click: Event) -> None:
         if click.is_right_click and self._state.selected_signal is not None:
@@ -29,16 +39,16 @@ class SimulationController(ClickableUIComponent, FullScreenUIComponent):
         if target.kind is SimulationTargetType.NODE and self._state.selected_signal is not None:
             is_blocked = bool(self._railway.graph.get_node_attr(target.node, "blocked"))
             if is_blocked:
-                self._railway.graph.unblock_node(target.node)
+                self._executor.unblock_node(target.node)
             else:
-                self._railway.graph.block_node(target.node)
+                self._executor.block_node(target.node)
         
         elif target.kind is SimulationTargetType.TRAIN:
             self._state.select_train(target.train_id)
             
         elif target.kind is SimulationTargetType.SIGNAL:
             if click.is_right_click:
-                self._railway.signalling.drop_signal(target.signal)
+                self._executor.drop_signal(target.signal)
                 return
             
             
@@ -55,17 +65,17 @@ class SimulationController(ClickableUIComponent, FullScreenUIComponent):
             
             
             if shift_pressed:
-                message = self._railway.signalling.auto_connect_signals(self._state.selected_signal, target.signal)
+                message = self._executor.auto_connect_signals(self._state.selected_signal, target.signal)
                 if message is None:
                     self._state.selected_signal = None
-                    self._railway.graph.remove_blocked_nodes()
+                    self._executor.remove_blocked_nodes()
                 else:
                     self._graphics.alert_component.show_alert(message)
             else:
-                successful = self._railway.signalling.connect_signals(self._state.selected_signal, target.signal)
+                successful = self._executor.connect_signals(self._state.selected_signal, target.signal)
                 if successful:
                     self._state.selected_signal = None
-                    self._railway.graph.remove_blocked_nodes()
+                    self._executor.remove_blocked_nodes()
                 else:
                     self._graphics.alert_component.show_alert("Failed to connect signals: Path is blocked or invalid.")
 
@@ -78,7 +88,11 @@ class SimulationController(ClickableUIComponent, FullScreenUIComponent):
     
     def tick(self):
         if self._state.time_control.paused:
+            self._clock.pause()
             return
-        self._state.tick()
-        for _ in range(self._state.time_control.mode.value):
-            self._railway.tick()
\ No newline at end of file
+        mode = self._state.time_control.mode
+        advance = self._dispatcher.advance if self._state.time_control.auto_dispatch else self._executor.advance
+        if mode is TimeControlMode.MAX_SPEED:
+            self._clock.run_for_budget(advance)
+        else:
+            advance(self._clock.ticks_due(mode.value))
\ No newline at end of file
@@ -30,11 +30,9 @@ class SimulationView(ClickableUIComponent, FullScreenUIComponent):
             
         target = find_simulation_target(self._railway, world_pos)
         
-        preview_path = []
+        preview_path = frozenset()
         if target.kind is SimulationTargetType.SIGNAL and self._state.selected_signal is not None:
-            path = self._railway.signalling.get_path_preview(self._state.selected_signal, target.signal)
-            if path is not None:
-                preview_path = path
+            preview_path = self._railway.signalling.get_path_preview(self._state.selected_signal, target.signal)
             
             
         draw_grid(self._screen, self._camera)
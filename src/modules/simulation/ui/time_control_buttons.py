@@ -19,6 +19,7 @@ class TimeControlButtons(ClickableUIComponent, ShortcutUIComponent):
             for mode in TimeControlMode
         }
         self.buttons = self._get_buttons(screen)
+        self.auto_dispatch_button = self._get_auto_dispatch_button()
         self.time_control_state = time_control
         self._screen = screen
         
@@ -30,6 +31,8 @@ class TimeControlButtons(ClickableUIComponent, ShortcutUIComponent):
     def set_time_control_mode(self, mode: TimeControlMode | str):
         if mode == "toggle_pause":
             self.time_control_state.toggle_pause()
+        elif mode == "toggle_auto_dispatch":
+            self.time_control_state.toggle_auto_dispatch()
         else:
             self.time_control_state.switch_mode(mode)
         
@@ -40,6 +43,10 @@ class TimeControlButtons(ClickableUIComponent, ShortcutUIComponent):
                 if event.is_left_click:
                     self.time_control_state.mode = mode
                 return True
+        if self.auto_dispatch_button.collidepoint(*event.screen_pos):
+            if event.is_left_click:
+                self.time_control_state.toggle_auto_dispatch()
+            return True
         return False
 
     def render(self, screen_pos: Position) -> None:
@@ -55,9 +62,22 @@ class TimeControlButtons(ClickableUIComponent, ShortcutUIComponent):
                 pygame.draw.rect(self._screen, Color.GREEN, btn_rect, 2, border_radius=10)
             else:
                 pygame.draw.rect(self._screen, Color.WHITE, btn_rect, 2, border_radius=10)
+        self._render_auto_dispatch_button(screen_pos)
+
+    def _render_auto_dispatch_button(self, screen_pos: Position) -> None:
+        """Toggle for the automatic dispatcher, outlined green while it sets the routes."""
+        btn_rect = self.auto_dispatch_button
+        bg_color = Color.DARKGREY if screen_pos is not None and btn_rect.collidepoint(*screen_pos) else Color.BLACK
+        pygame.draw.rect(self._screen, bg_color, btn_rect, border_radius=10)
+        font = pygame.font.Font(None, 24)
+        text = font.render("Auto", True, Color.WHITE)
+        self._screen.blit(text, text.get_rect(center=btn_rect.center))
+        border_color = Color.GREEN if self.time_control_state.auto_dispatch else Color.WHITE
+        pygame.draw.rect(self._screen, border_color, btn_rect, 2, border_radius=10)
 
     def contains(self, screen_pos: Position) -> bool:
-        return any(btn.collidepoint(*screen_pos) for _, btn in self.buttons)
+        return (any(btn.collidepoint(*screen_pos) for _, btn in self.buttons)
+                or self.auto_dispatch_button.collidepoint(*screen_pos))
 
 
     def _get_buttons(self, screen: pygame.Surface) -> list[tuple[TimeControlMode, pygame.Rect]]:
@@ -73,4 +93,10 @@ class TimeControlButtons(ClickableUIComponent, ShortcutUIComponent):
                 Config.BUTTON_SIZE
             )
             buttons.append((mode, rect))
-        return buttons
\ No newline at end of file
+        return buttons
+
+    def _get_auto_dispatch_button(self) -> pygame.Rect:
+        """Right of the time control buttons, set apart from them by one more margin."""
+        button_margin = Config.BUTTON_SIZE // 5
+        last = self.buttons[-1][1]
+        return pygame.Rect(last.right + 2 * button_margin, button_margin, Config.BUTTON_SIZE, Config.BUTTON_SIZE)
\ No newline at end of file
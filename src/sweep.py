@@ -0,0 +1,78 @@
+import argparse
+import csv
+import json
+import os
+
+from core.simulation.parameter_sweep import grid, run_sweep
+
+COLUMNS = ("parameters", "punctuality", "stops/h", "services", "wall s", "error")
+
+
+def _minutes(text: str) -> int:
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _values(kind):
+    return lambda text: [kind(value) for value in text.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate every combination of timetable and train parameters in parallel.")
+    parser.add_argument("map", help="map JSON file, e.g. maps/142.json")
+    parser.add_argument("--frequency", type=_values(int), help="minutes between services, comma separated")
+    parser.add_argument("--first-train", type=_values(_minutes), help="first departures (HH:MM), comma separated")
+    parser.add_argument("--last-train", type=_values(_minutes), help="last departures (HH:MM), comma separated")
+    parser.add_argument("--acceleration", type=_values(float), help="train accelerations in m/s2, comma separated")
+    parser.add_argument("--deceleration", type=_values(float), help="train decelerations in m/s2, comma separated")
+    parser.add_argument("--car-count", type=_values(int), help="cars per train, comma separated")
+    parser.add_argument("--start", default=None, help="simulation start time (HH:MM), 06:00 unless replaying")
+    parser.add_argument("--duration", type=float, default=3600.0, help="simulated seconds per variant")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--csv", metavar="FILE", help="also write the table as CSV")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--start-trains", action="store_true", help="schedule and start every train in each variant")
+    source.add_argument("--replay", metavar="LOG", help="command log to apply to each variant, recorded on the same map")
+    parser.add_argument("--auto-dispatch", action="store_true", help="let the automatic dispatcher set the routes in each variant")
+    args = parser.parse_args()
+    if args.auto_dispatch and args.replay is not None:
+        parser.error("--replay repeats the recorded routes, --auto-dispatch sets them itself")
+
+    with open(args.map, 'r', encoding='utf-8') as f:
+        map_data = json.load(f)
+    log_data = None
+    if args.replay is not None:
+        if args.start is not None:
+            parser.error("--replay uses the start time of the log")
+        with open(args.replay, 'r', encoding='utf-8') as f:
+            log_data = json.load(f)
+
+    axes = {name: getattr(args, name) for name in
+            ("frequency", "first_train", "last_train", "acceleration", "deceleration", "car_count")}
+    variants = grid(**{name: values for name, values in axes.items() if values is not None})
+    print(f"running {len(variants)} variants on {args.workers} workers")
+
+    rows = []
+    for result in run_sweep(map_data, variants, args.start or "06:00", args.duration,
+                            args.start_trains, log_data, args.workers, args.auto_dispatch):
+        if result.error is not None:
+            rows.append((result.parameters.label(), "-", "-", "-", f"{result.wall_seconds:.2f}", result.error))
+        else:
+            rows.append((
+                result.parameters.label(), f"{result.punctuality:.1%}", f"{result.throughput:.1f}",
+                str(result.services_completed), f"{result.wall_seconds:.2f}", "",
+            ))
+
+    widths = [max(len(row[column]) for row in (COLUMNS, *rows)) for column in range(len(COLUMNS))]
+    for row in (COLUMNS, *rows):
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+
+    if args.csv is not None:
+        with open(args.csv, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
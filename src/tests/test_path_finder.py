@@ -0,0 +1,42 @@
+import json
+import time
+import unittest
+from pathlib import Path
+
+from core.models.geometry.direction import Direction
+from core.models.geometry.node import Node
+from core.models.geometry.pose import Pose
+from core.models.railway.railway_system import RailwaySystem
+
+MAP = Path(__file__).resolve().parents[2] / 'maps' / '142.json'
+
+
+class TunnelPathTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.railway = RailwaySystem()
+        self.railway.replace_from_dict(json.loads(MAP.read_text()))
+
+    def test_unreachable_exit_returns_none_quickly(self) -> None:
+        # the exit would have to run along the surface track ending at (8, 20)
+        start = Pose(Node(17, -4), Direction(0, 1))
+        end = Pose(Node(8, 20), Direction(1, 0))
+
+        began = time.perf_counter()
+        path = self.railway.pathfinder.preview_tunnel_path(start, end)
+        elapsed = time.perf_counter() - began
+
+        self.assertIsNone(path)
+        self.assertLess(elapsed, 0.2)
+
+    def test_reachable_exit_is_found(self) -> None:
+        start = Pose(Node(17, -4), Direction(0, 1))
+        end = Pose(Node(8, 24), Direction(1, 0))
+
+        path = self.railway.pathfinder.preview_tunnel_path(start, end)
+
+        self.assertIsNotNone(path)
+        self.assertEqual((path[0], path[-1]), (start.node, end.node))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import unittest
+from pathlib import Path
+
+from core.models.railway.railway_change import ChangeKind
+from core.models.railway.railway_system import RailwaySystem
+from core.simulation.auto_dispatcher import AutoDispatcher
+from core.simulation.command_executor import CommandExecutor
+from core.simulation.command_log import CommandLog
+from core.simulation.event_engine import EventEngine
+from core.simulation.simulation_runner import SimulationRunner
+
+MAP = Path(__file__).resolve().parents[2] / 'maps' / '142.json'
+
+
+def simulation_state(railway: RailwaySystem) -> tuple:
+    trains = [(train.id, train.speed, train._path_distance, len(train.path), train.live) for train in railway.trains.all()]
+    locked = sorted(edge.sorted() for edge in railway.graph.edges if railway.signalling.is_edge_locked(edge))
+    blocked = sorted(railway.graph.all_nodes_with_attr('blocked'))
+    return railway.time.current_time, trains, locked, blocked
+
+
+class RailwaySnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.railway = RailwaySystem()
+        self.railway.replace_from_dict(json.loads(MAP.read_text()))
+        runner = SimulationRunner(self.railway)
+        runner.prepare("05:30")
+        runner.start_trains()
+        self.executor = CommandExecutor(self.railway, CommandLog("05:30"))
+
+    def test_restore_unblocks_nodes_blocked_after_the_snapshot(self) -> None:
+        engine = EventEngine(self.railway)
+        engine.advance(2000)
+        kept, dropped = sorted(self.railway.graph.nodes)[:2]
+        self.executor.block_node(kept)
+        snapshot = self.railway.snapshot()
+        expected = simulation_state(self.railway)
+
+        self.executor.block_node(dropped)
+        self.executor.unblock_node(kept)
+        engine.advance(4000)
+        self.railway.restore(snapshot)
+
+        self.assertEqual(simulation_state(self.railway), expected)
+
+    def test_restore_notifies_subscribers_and_resets_the_dispatcher(self) -> None:
+        dispatcher = AutoDispatcher(self.railway, self.executor)
+        changes = []
+        self.railway.subscribe_to_modifications(changes.append)
+        dispatcher.advance(2400)
+        snapshot = self.railway.snapshot()
+        dispatcher.advance(24000)
+        self.railway.restore(snapshot)
+
+        self.assertIs(changes[-1].kind, ChangeKind.RESTORED)
+        self.assertEqual(dispatcher._retry, {})
+        self.assertEqual(dispatcher._reversed, set())
+        for train_id, (schedule, index) in dispatcher._routed.items():
+            train = self.railway.trains.get(train_id)
+            self.assertIs(train.schedule, schedule)
+            self.assertIn(index, (schedule.index, schedule.index + 1))
+
+
+if __name__ == '__main__':
+    unittest.main()